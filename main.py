@@ -1,26 +1,798 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
+import functools
+import json
 import os
+import secrets
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 import threading
+import time
 
+import numpy as np
 import pandas as pd
+import pydantic_core
 from fastmcp import FastMCP
+from fastmcp.server.dependencies import get_context
 from starlette.responses import JSONResponse, PlainTextResponse
 
+try:  # Optional: columnar sidecars need pyarrow.
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+    pa_ipc = None
 
-mcp = FastMCP("csv-analyst")
+try:  # Optional: faster JSON serialization of tool results.
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
 
-_lock = threading.Lock()
+try:  # Optional: the duckdb query backend (CSV_MCP_QUERY_BACKEND=duckdb).
+    import duckdb
+except ImportError:  # pragma: no cover - depends on the environment
+    duckdb = None
 
 
-class _State:
+def _json_default(obj: Any) -> Any:
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, (pd.Timestamp, pd.Timedelta)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+def _serialize_tool_result(data: Any) -> str:
+    """
+    Text serialization of tool results: orjson (NumPy-aware) when installed,
+    otherwise FastMCP's default pydantic serializer.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            data, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ).decode()
+    return pydantic_core.to_json(data, fallback=str).decode()
+
+
+mcp = FastMCP("csv-analyst", tool_serializer=_serialize_tool_result)
+
+_DEFAULT_SESSION_ID = "default"
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+class _RWLock:
+    """
+    Reader/writer lock: any number of readers, or one writer.
+
+    Writers are preferred: once a writer is waiting, new readers queue behind it
+    so a stream of queries cannot starve load_csv.
+    """
+
     def __init__(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+def _merge_dtypes(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    """Widen two chunk dtypes the way a single full-file parse would."""
+    if a is None or a == b:
+        return b
+    if b is None:
+        return a
+    try:
+        da, db = np.dtype(a), np.dtype(b)
+    except TypeError:
+        return "object"
+    if da.kind in "iuf" and db.kind in "iuf":
+        return str(np.result_type(da, db))
+    return "object"
+
+
+class _StreamingProfile:
+    """
+    The _basic_profile of a CSV, accumulated one chunk at a time so files larger
+    than memory can still be profiled.
+
+    Chunks where a column is entirely missing do not vote on its dtype (pandas
+    reads them as float64 regardless of what the column holds elsewhere).
+    """
+
+    def __init__(self) -> None:
+        self.columns: List[str] = []
+        self.row_count = 0
+        self.missing: Dict[str, int] = {}
+        self.dtypes: Dict[str, Optional[str]] = {}
+        self.complete = False
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        missing = chunk.isna().sum()
+        n = int(chunk.shape[0])
+        with self._lock:
+            if not self.columns:
+                self.columns = list(chunk.columns)
+            self.row_count += n
+            for c in self.columns:
+                nulls = int(missing[c])
+                self.missing[c] = self.missing.get(c, 0) + nulls
+                if nulls < n:
+                    self.dtypes[c] = _merge_dtypes(self.dtypes.get(c), str(chunk[c].dtype))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "row_count": self.row_count,
+                "column_count": len(self.columns),
+                "columns": list(self.columns),
+                "dtypes": {c: self.dtypes.get(c) or "float64" for c in self.columns},
+                "missing_by_column": dict(self.missing),
+                "complete": self.complete,
+                "error": self.error,
+            }
+
+
+class _CsvStream:
+    """
+    A CSV read in fixed-size chunks instead of held in memory (load_csv with
+    chunk_rows). The first chunk is profiled inline; the rest is profiled on a
+    background thread while the session can already answer get_schema.
+    """
+
+    def __init__(self, csv_path: Path, read_kwargs: Dict[str, Any], chunk_rows: int) -> None:
+        self.csv_path = csv_path
+        self.read_kwargs = read_kwargs
+        self.chunk_rows = chunk_rows
+        self.profile = _StreamingProfile()
+        self._cancelled = threading.Event()
+
+    def reader(self) -> Any:
+        return pd.read_csv(self.csv_path, chunksize=self.chunk_rows, **self.read_kwargs)
+
+    def profile_remaining(self, reader: Any) -> None:
+        try:
+            with reader:
+                for chunk in reader:
+                    if self._cancelled.is_set():
+                        return
+                    self.profile.add(chunk)
+            self.profile.complete = True
+        except Exception as e:
+            self.profile.error = f"{type(e).__name__}: {e}"
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+
+def _spill_dir() -> Optional[str]:
+    return os.getenv("CSV_MCP_SPILL_DIR") or None
+
+
+def _unlink_quietly(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+class _SpilledResult:
+    """
+    A tool result too large to hold in memory, appended chunk by chunk to a
+    temporary CSV. The file is removed once the result is no longer referenced.
+    """
+
+    def __init__(self) -> None:
+        fd, path = tempfile.mkstemp(prefix="csv-analyst-result-", suffix=".csv", dir=_spill_dir())
+        os.close(fd)
+        self.path = Path(path)
+        self.row_count = 0
+        # (first row, byte offset) of every appended block, so a page can seek
+        # to the nearest block instead of re-parsing the file from the top.
+        self._marks: List[Tuple[int, int]] = []
+        weakref.finalize(self, _unlink_quietly, self.path)
+
+    def append(self, rows: pd.DataFrame, header: bool) -> None:
+        if header:
+            rows.head(0).to_csv(self.path, index=False)
+        if not rows.empty:
+            self._marks.append((self.row_count, self.path.stat().st_size))
+            rows.to_csv(self.path, mode="a", header=False, index=False)
+        self.row_count += int(rows.shape[0])
+
+    def page(self, offset: int, size: int) -> pd.DataFrame:
+        columns = list(pd.read_csv(self.path, nrows=0).columns)
+        first, pos = 0, None
+        for row, byte in self._marks:
+            if row > offset:
+                break
+            first, pos = row, byte
+        if pos is None:
+            # Written in one go (e.g. by DuckDB's COPY): skip rows after the header.
+            return pd.read_csv(self.path, skiprows=range(1, offset + 1), nrows=size)
+        with open(self.path, "rb") as f:
+            f.seek(pos)
+            return pd.read_csv(f, header=None, names=columns, skiprows=offset - first, nrows=size)
+
+    def to_csv(self, path: Path) -> None:
+        shutil.copyfile(self.path, path)
+
+
+class _LazyResult:
+    """
+    A row/column selection of an immutable DataFrame, kept as a reference plus
+    a row selector instead of a copy. Rows are only materialized on export, one
+    block at a time.
+
+    The selector is a boolean mask (1 byte per source row) or, for selective
+    filters, the matching row positions (8 bytes per match), whichever is smaller.
+    """
+
+    _BLOCK_ROWS = 250_000
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        mask: Union[pd.Series, np.ndarray, None] = None,
+        columns: Optional[List[str]] = None,
+    ) -> None:
+        self.df = df
+        self.columns = columns
+        self._col_idx = [df.columns.get_loc(c) for c in columns] if columns else slice(None)
+        if mask is None:
+            self._rows: Optional[np.ndarray] = None
+            self.row_count = int(df.shape[0])
+            return
+        if isinstance(mask, pd.Series):
+            mask = mask.to_numpy(dtype=bool, na_value=False)
+        self.row_count = int(np.count_nonzero(mask))
+        self._rows = np.flatnonzero(mask) if self.row_count * 8 < len(mask) else mask
+
+    def head(self, n: int) -> pd.DataFrame:
+        return self.page(0, n)
+
+    def page(self, offset: int, size: int) -> pd.DataFrame:
+        """Selected rows offset .. offset + size."""
+        stop = offset + max(size, 0)
+        if self._rows is None:
+            positions = np.arange(offset, min(stop, self.row_count))
+        elif self._rows.dtype == bool:
+            positions = np.flatnonzero(self._rows)[offset:stop]
+        else:
+            positions = self._rows[offset:stop]
+        return self._take(positions)
+
+    def to_csv(self, path: Path) -> None:
+        n = int(self.df.shape[0])
+        self._take(np.arange(0)).to_csv(path, index=False)
+        for start in range(0, n, self._BLOCK_ROWS):
+            positions = self._positions(start, start + self._BLOCK_ROWS)
+            if len(positions):
+                self._take(positions).to_csv(path, mode="a", header=False, index=False)
+
+    def _positions(self, start: int, stop: int) -> np.ndarray:
+        """Selected row positions within source rows start .. stop."""
+        if self._rows is None:
+            return np.arange(start, min(stop, int(self.df.shape[0])))
+        if self._rows.dtype == bool:
+            return start + np.flatnonzero(self._rows[start:stop])
+        lo, hi = np.searchsorted(self._rows, [start, stop])
+        return self._rows[lo:hi]
+
+    def _take(self, positions: np.ndarray) -> pd.DataFrame:
+        return self.df.iloc[positions, self._col_idx]
+
+
+class _SpillingReducer:
+    """
+    Merges per-chunk partial aggregates keyed by `keys`.
+
+    Partials are buffered and re-reduced in memory; once the reduced buffer still
+    holds more than max_rows groups, it is hash-partitioned by key and spilled to
+    disk. result() then merges one partition at a time, so only that partition's
+    groups have to fit in memory. With no merge spec the partials are distinct
+    key tuples (used for nunique) and merging is de-duplication.
+    """
+
+    def __init__(self, keys: List[str], merge: Dict[str, str], max_rows: int, partitions: int = 16) -> None:
+        self.keys = keys
+        self.merge = merge
+        self.max_rows = max_rows
+        self.partitions = partitions
+        self._buffer: List[pd.DataFrame] = []
+        self._buffered_rows = 0
+        self._spill_dir: Optional[tempfile.TemporaryDirectory] = None
+        self._spills = 0
+
+    def add(self, partial: pd.DataFrame) -> None:
+        self._buffer.append(partial)
+        self._buffered_rows += int(partial.shape[0])
+        if self._buffered_rows > self.max_rows:
+            reduced = self._reduce(pd.concat(self._buffer, ignore_index=True))
+            self._buffer = [reduced]
+            self._buffered_rows = int(reduced.shape[0])
+            if self._buffered_rows > self.max_rows:
+                self._spill()
+
+    def result(self) -> pd.DataFrame:
+        if self._spill_dir is None:
+            if not self._buffer:
+                return pd.DataFrame(columns=self.keys + list(self.merge))
+            return self._reduce(pd.concat(self._buffer, ignore_index=True))
+
+        self._spill()
+        root = Path(self._spill_dir.name)
+        try:
+            parts = []
+            for p in range(self.partitions):
+                files = sorted(root.glob(f"{p}-*.pkl"))
+                if files:
+                    parts.append(self._reduce(pd.concat([pd.read_pickle(f) for f in files], ignore_index=True)))
+            return pd.concat(parts, ignore_index=True)
+        finally:
+            self._spill_dir.cleanup()
+
+    def _reduce(self, frame: pd.DataFrame) -> pd.DataFrame:
+        if not self.merge:
+            return frame.drop_duplicates(ignore_index=True)
+        return frame.groupby(self.keys, dropna=False, sort=False).agg(self.merge).reset_index()
+
+    def _spill(self) -> None:
+        if not self._buffer:
+            return
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.TemporaryDirectory(prefix="csv-analyst-spill-", dir=_spill_dir())
+        frame = pd.concat(self._buffer, ignore_index=True)
+        bucket = pd.util.hash_pandas_object(frame[self.keys], index=False).to_numpy() % self.partitions
+        for p in range(self.partitions):
+            part = frame[bucket == p]
+            if not part.empty:
+                part.to_pickle(Path(self._spill_dir.name) / f"{p}-{self._spills}.pkl")
+        self._spills += 1
+        self._buffer = []
+        self._buffered_rows = 0
+
+
+# HyperLogLog sketches for approx_nunique: values are hashed to 64 bits; the top
+# `precision` bits pick one of 2**precision registers per group, and a register
+# keeps the highest rank (1 + leading zeros) seen in the low _HLL_RANK_BITS bits.
+_HLL_PRECISION = 12
+_HLL_RANK_BITS = 50
+# Dense in-memory registers (groups * 2**precision bytes) are kept below this;
+# with many groups the precision is lowered instead.
+_HLL_MAX_REGISTERS = 1 << 24
+
+
+def _hll_hashes(series: pd.Series, precision: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(non-missing mask, register, rank) of the values of series."""
+    valid = series.notna().to_numpy()
+    hashes = pd.util.hash_pandas_object(series[valid], index=False).to_numpy()
+    register = (hashes >> np.uint64(64 - precision)).astype(np.intp)
+    # Exact as float64: the low bits are below 2**53.
+    low = (hashes & np.uint64((1 << _HLL_RANK_BITS) - 1)).astype(np.float64)
+    with np.errstate(divide="ignore"):
+        rank = np.where(low > 0, _HLL_RANK_BITS - np.floor(np.log2(low)), _HLL_RANK_BITS + 1)
+    return valid, register, rank.astype(np.uint8)
+
+
+def _hll_estimate(inverse_sum: np.ndarray, zeros: np.ndarray, precision: int) -> np.ndarray:
+    """
+    Distinct-count estimates from, per group, the sum of 2**-rank over all
+    registers (empty registers count 1) and the number of empty registers.
+    """
+    m = 1 << precision
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw = alpha * m * m / inverse_sum
+        # Small cardinalities: linear counting over the empty registers.
+        linear = m * np.log(m / zeros)
+    return np.rint(np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)).astype(np.int64)
+
+
+def _hll_bound(precision: int) -> Dict[str, Any]:
+    return {
+        "method": "hyperloglog",
+        "precision": precision,
+        "relative_standard_error": round(1.04 / float(np.sqrt(1 << precision)), 4),
+    }
+
+
+# How each aggregation is computed per chunk and merged across chunks.
+# mean is carried as sum + count; nunique as distinct (group, value) pairs;
+# approx_nunique as the max rank per (group, HyperLogLog register).
+_PARTIAL_AGGS = {
+    "sum": [("sum", "sum")],
+    "count": [("count", "sum")],
+    "min": [("min", "min")],
+    "max": [("max", "max")],
+    "mean": [("sum", "sum"), ("count", "sum")],
+}
+
+
+def _groupby_streaming(
+    stream: _CsvStream,
+    group_columns: List[str],
+    agg_map: Dict[str, List[str]],
+    filters: Optional[List[Dict[str, Any]]] = None,
+    logic: str = "and",
+) -> pd.DataFrame:
+    """
+    Out-of-core equivalent of df.groupby(group_columns, dropna=False).agg(agg_map),
+    over the rows matching filters.
+    """
+    max_rows = _env_int("CSV_MCP_SPILL_ROWS", 1_000_000)
+
+    partial_map: Dict[str, List[str]] = {}
+    merge: Dict[str, str] = {}
+    distinct: Dict[str, _SpillingReducer] = {}
+    sketches: Dict[str, _SpillingReducer] = {}
+    for col, fns in agg_map.items():
+        for fn in fns:
+            if fn == "nunique":
+                distinct[col] = _SpillingReducer(group_columns + [col], {}, max_rows)
+                continue
+            if fn == "approx_nunique":
+                sketches[col] = _SpillingReducer(group_columns + ["__register"], {"__rank": "max"}, max_rows)
+                continue
+            for part, merge_fn in _PARTIAL_AGGS[fn]:
+                if part not in partial_map.setdefault(col, []):
+                    partial_map[col].append(part)
+                    merge[f"{col}__{part}"] = merge_fn
+    totals = _SpillingReducer(group_columns, merge, max_rows)
+
+    plan: Optional[_FilterPlan] = None
+    with stream.reader() as reader:
+        for chunk in reader:
+            if filters:
+                plan = plan or _FilterPlan(chunk, filters, logic)
+                chunk = chunk[plan.mask(chunk)]
+            if partial_map:
+                partial = chunk.groupby(group_columns, dropna=False, sort=False).agg(partial_map)
+                partial.columns = [f"{c}__{f}" for c, f in partial.columns]
+                totals.add(partial.reset_index())
+            else:
+                totals.add(chunk[group_columns].drop_duplicates())
+            for col, reducer in distinct.items():
+                reducer.add(chunk[group_columns + [col]].drop_duplicates())
+            for col, reducer in sketches.items():
+                valid, register, rank = _hll_hashes(chunk[col], _HLL_PRECISION)
+                ranks = chunk.loc[valid, group_columns].assign(__register=register, __rank=rank)
+                reducer.add(ranks.groupby(group_columns + ["__register"], dropna=False, sort=False).max().reset_index())
+
+    grouped = totals.result().set_index(group_columns)
+    out = pd.DataFrame(index=grouped.index)
+    approximate: Dict[str, Any] = {}
+    for col, fns in agg_map.items():
+        for fn in fns:
+            name = f"{col}_{fn}"
+            if fn == "nunique":
+                pairs = distinct[col].result()
+                counts = pairs.groupby(group_columns, dropna=False)[col].nunique()
+                out[name] = counts.reindex(out.index, fill_value=0)
+            elif fn == "approx_nunique":
+                ranks = sketches[col].result()
+                registers = ranks.assign(__inverse=np.exp2(-ranks["__rank"].astype(np.float64))).groupby(
+                    group_columns, dropna=False
+                )
+                filled = registers.size().reindex(out.index, fill_value=0).to_numpy()
+                zeros = (1 << _HLL_PRECISION) - filled
+                inverse = registers["__inverse"].sum().reindex(out.index, fill_value=0.0).to_numpy() + zeros
+                out[name] = _hll_estimate(inverse, zeros, _HLL_PRECISION)
+                approximate[name] = _hll_bound(_HLL_PRECISION)
+            elif fn == "mean":
+                out[name] = grouped[f"{col}__sum"] / grouped[f"{col}__count"]
+            else:
+                out[name] = grouped[f"{col}__{_PARTIAL_AGGS[fn][0][0]}"]
+    out = out.sort_index(na_position="last").reset_index()
+    if approximate:
+        out.attrs["approximate"] = approximate
+    return out
+
+
+def _dictionary_encode(df: pd.DataFrame, max_ratio: float) -> Dict[str, int]:
+    """
+    Convert low-cardinality text columns of df to categoricals in place
+    (distinct values <= max_ratio * non-null values). Categories are sorted and
+    ordered, so comparisons and min/max keep their string semantics while
+    filters, value_counts and groupbys work on the integer codes.
+
+    Returns {column: bytes saved}.
+    """
+    saved: Dict[str, int] = {}
+    for c in df.columns:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype) or not pd.api.types.is_string_dtype(s.dtype):
+            continue
+        non_null = int(s.count())
+        if non_null == 0:
+            continue
+        uniques = s.dropna().unique()
+        if len(uniques) > max_ratio * non_null:
+            continue
+        try:
+            categories = sorted(uniques)
+        except TypeError:  # mixed types in an object column
+            continue
+        encoded = s.astype(pd.CategoricalDtype(categories, ordered=True))
+        before = int(s.memory_usage(deep=True, index=False))
+        after = int(encoded.memory_usage(deep=True, index=False))
+        if after < before:
+            df[c] = encoded
+            saved[c] = before - after
+    return saved
+
+
+class _Dataset:
+    """
+    A parsed CSV as cached by FRAME_CACHE and held by sessions.
+
+    Immutable once built: the same instance may be shared by several sessions.
+    Its column statistics are computed here, once per parse, unless
+    CSV_MCP_COLUMN_STATS=0.
+    """
+
+    def __init__(self, df: pd.DataFrame, encoded: Optional[Dict[str, int]] = None) -> None:
+        self.df = df
+        self.nbytes = int(df.memory_usage(deep=True).sum())
+        self.encoded: Dict[str, int] = encoded or {}
+        self.stats = COLUMN_CACHE.statistics(df) if _COLUMN_STATS else None
+
+
+_CursorResult = Union[pd.DataFrame, _LazyResult, _SpilledResult]
+
+
+def _result_row_count(result: _CursorResult) -> int:
+    if isinstance(result, pd.DataFrame):
+        return int(result.shape[0])
+    return result.row_count
+
+
+def _result_page(result: _CursorResult, offset: int, size: int) -> pd.DataFrame:
+    if isinstance(result, pd.DataFrame):
+        return result.iloc[offset : offset + max(size, 0)]
+    return result.page(offset, size)
+
+
+class _CursorTable:
+    """
+    Server-side cursors over one session's query results.
+
+    A cursor keeps the full result (a DataFrame, a _LazyResult over the immutable
+    source frame, or a _SpilledResult file) so later pages are served without
+    re-running the query. Cursors expire ttl_seconds after their last use, and
+    beyond max_open the least recently used one is dropped.
+    """
+
+    def __init__(self, ttl_seconds: float, max_open: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_open = max_open
+        self._cursors: "OrderedDict[str, Tuple[_CursorResult, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, result: _CursorResult) -> str:
+        cursor_id = secrets.token_urlsafe(12)
+        with self._lock:
+            self._evict_expired()
+            self._cursors[cursor_id] = (result, time.monotonic())
+            while len(self._cursors) > max(self.max_open, 1):
+                self._cursors.popitem(last=False)
+        return cursor_id
+
+    def get(self, cursor_id: str) -> _CursorResult:
+        with self._lock:
+            self._evict_expired()
+            entry = self._cursors.get(cursor_id)
+            if entry is None:
+                raise ValueError(f"Unknown or expired cursor: {cursor_id}")
+            self._cursors[cursor_id] = (entry[0], time.monotonic())
+            self._cursors.move_to_end(cursor_id)
+            return entry[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._evict_expired()
+            return len(self._cursors)
+
+    def _evict_expired(self) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._cursors:
+            cursor_id, (_, last_used) = next(iter(self._cursors.items()))
+            if last_used >= cutoff:
+                break
+            del self._cursors[cursor_id]
+
+
+_CURSOR_TTL_SECONDS = _env_float("CSV_MCP_CURSOR_TTL_SECONDS", 900.0)
+_MAX_CURSORS = _env_int("CSV_MCP_MAX_CURSORS", 16)
+
+
+class _Session:
+    """
+    Dataset state owned by a single MCP session.
+
+    Each session loads its own CSV, so concurrent clients no longer overwrite
+    each other's DataFrame or serialize on one global lock.
+
+    A loaded DataFrame is never mutated in place: load_csv swaps in a new one
+    under the write lock, and every query tool only reads under the read lock.
+    The same _Dataset may also be shared with other sessions via FRAME_CACHE.
+    """
+
+    def __init__(self, session_id: str) -> None:
+        self.session_id = session_id
         self.csv_path: Optional[str] = None
-        self.df: Optional[pd.DataFrame] = None
-        self.last_result: Optional[pd.DataFrame] = None
+        self.dataset: Optional[_Dataset] = None
+        self.stream: Optional[_CsvStream] = None
+        self.last_result: Union[pd.DataFrame, _LazyResult, _SpilledResult, None] = None
+        self.cursors = _CursorTable(_CURSOR_TTL_SECONDS, _MAX_CURSORS)
+        self.last_used: float = time.monotonic()
+        self.lock = _RWLock()
+
+    @property
+    def df(self) -> Optional[pd.DataFrame]:
+        return self.dataset.df if self.dataset is not None else None
+
+    @property
+    def nbytes(self) -> int:
+        return self.dataset.nbytes if self.dataset is not None else 0
+
+    def touch(self) -> None:
+        self.last_used = time.monotonic()
+
+    def set_last_result(self, source: Any, result: Any) -> None:
+        """
+        Keep a query's result for export_last_result, unless load_csv has
+        replaced the data the query read (source: its DataFrame or stream).
+        """
+        with self.lock.write():
+            if source is (self.df if self.df is not None else self.stream):
+                self.last_result = result
+
+
+class _SessionRegistry:
+    """
+    Session-scoped state keyed by the mcp-session-id.
+
+    - Sessions idle longer than idle_seconds are dropped on the next access.
+    - When the loaded DataFrames exceed memory_budget_bytes, the least recently
+      used sessions are dropped first (the active session is always kept).
+      A DataFrame shared by several sessions counts once, and a session is
+      only dropped when that frees its DataFrame: not while another session
+      or FRAME_CACHE still holds it (FRAME_CACHE enforces its own cap).
+    """
+
+    def __init__(self, idle_seconds: float, memory_budget_bytes: int) -> None:
+        self.idle_seconds = idle_seconds
+        self.memory_budget_bytes = memory_budget_bytes
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> _Session:
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = _Session(session_id)
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            session.touch()
+            return session
+
+    def enforce_budget(self, keep: _Session) -> List[str]:
+        """Drop least recently used sessions until the memory budget is met."""
+        evicted: List[str] = []
+        if self.memory_budget_bytes <= 0:
+            return evicted
+        with self._lock:
+            holders: Dict[int, int] = {}
+            for s in self._sessions.values():
+                if s.dataset is not None:
+                    holders[id(s.dataset)] = holders.get(id(s.dataset), 0) + 1
+            total = self._loaded_bytes()
+            for sid in list(self._sessions):
+                if total <= self.memory_budget_bytes:
+                    break
+                session = self._sessions[sid]
+                if session is keep or session.dataset is None:
+                    continue
+                if holders[id(session.dataset)] > 1 or FRAME_CACHE.holds(session.dataset):
+                    continue  # dropping the session would not free the frame
+                total -= session.nbytes
+                holders[id(session.dataset)] -= 1
+                del self._sessions[sid]
+                evicted.append(sid)
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "loaded_bytes": self._loaded_bytes(),
+                "open_cursors": int(sum(len(s.cursors) for s in self._sessions.values())),
+                "memory_budget_bytes": self.memory_budget_bytes,
+            }
+
+    def _loaded_bytes(self) -> int:
+        """Bytes of the distinct DataFrames held by sessions (caller holds the lock)."""
+        return int(sum({id(s.dataset): s.nbytes for s in self._sessions.values() if s.dataset is not None}.values()))
+
+    def _evict_idle(self) -> None:
+        if self.idle_seconds <= 0:
+            return
+        cutoff = time.monotonic() - self.idle_seconds
+        for sid in [sid for sid, s in self._sessions.items() if s.last_used < cutoff]:
+            del self._sessions[sid]
+
+
+class _State:
+    def __init__(self) -> None:
         self.base_dir: Path = self._default_base_dir()
+        self.base_dir_lock = _RWLock()
+        self.sessions = _SessionRegistry(
+            idle_seconds=_env_float("CSV_MCP_SESSION_IDLE_SECONDS", 3600.0),
+            memory_budget_bytes=int(_env_float("CSV_MCP_MEMORY_BUDGET_MB", 0.0) * 1024 * 1024),
+        )
 
     def _default_base_dir(self) -> Path:
         env_dir = os.getenv("CSV_MCP_BASEDIR")
@@ -32,6 +804,217 @@ class _State:
 STATE = _State()
 
 
+class _FrameCache:
+    """
+    LRU cache of parsed datasets shared by all sessions.
+
+    Keys identify the file content and how it was parsed:
+    (resolved path, mtime_ns, size, read options). Editing the file changes
+    mtime/size, so stale entries are simply never hit again and age out.
+
+    Entries are bounded by their in-memory size (max_bytes); a frame larger than
+    the whole budget is returned but not cached. Concurrent loads of the same
+    key parse once; the other callers wait and get the cached frame.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[Any, ...], _Dataset]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loading: Dict[Tuple[Any, ...], threading.Lock] = {}
+
+    def get_or_load(self, key: Tuple[Any, ...], loader: Callable[[], _Dataset]) -> Tuple[_Dataset, bool]:
+        """Return (dataset, cache_hit)."""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry, True
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    return entry, True
+                self.misses += 1
+            try:
+                dataset = loader()
+                with self._lock:
+                    self._store(key, dataset)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return dataset, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def holds(self, dataset: _Dataset) -> bool:
+        with self._lock:
+            return any(entry is dataset for entry in self._entries.values())
+
+    def _lookup(self, key: Tuple[Any, ...]) -> Optional[_Dataset]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def _store(self, key: Tuple[Any, ...], dataset: _Dataset) -> None:
+        if dataset.nbytes > self.max_bytes:
+            return
+        self._entries[key] = dataset
+        self._bytes += dataset.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+
+FRAME_CACHE = _FrameCache(max_bytes=int(_env_float("CSV_MCP_FRAME_CACHE_MB", 1024.0) * 1024 * 1024))
+
+
+def _frame_cache_key(csv_path: Path, read_kwargs: Dict[str, Any]) -> Tuple[Any, ...]:
+    st = csv_path.stat()
+    return (str(csv_path), st.st_mtime_ns, st.st_size, tuple(sorted(read_kwargs.items())))
+
+
+_CSV_ENGINES = {"c", "python", "pyarrow"}
+
+# Text columns with at most this many distinct values per non-null value are
+# dictionary-encoded (categorical) by load_csv.
+_CATEGORY_MAX_RATIO = 0.5
+_DTYPE_BACKENDS = {"numpy_nullable", "pyarrow"}
+
+_SIDECAR_SUFFIX = ".arrow"
+_SIDECAR_OPTIONS_KEY = b"csv_analyst.read_options"
+_SIDECAR_SOURCE_KEY = b"csv_analyst.source"
+
+
+def _sidecar_path(csv_path: Path) -> Path:
+    return csv_path.with_name(csv_path.name + _SIDECAR_SUFFIX)
+
+
+def _sidecar_tag(read_kwargs: Dict[str, Any]) -> bytes:
+    return json.dumps(sorted(read_kwargs.items())).encode("utf-8")
+
+
+def _sidecar_source(st: os.stat_result) -> bytes:
+    return json.dumps([st.st_size, st.st_mtime_ns]).encode("utf-8")
+
+
+def _read_sidecar(csv_path: Path, read_kwargs: Dict[str, Any]) -> Optional[pd.DataFrame]:
+    """
+    Memory-map the Arrow IPC sidecar of csv_path if it was written from a CSV of
+    exactly the current size and mtime with the same read options; otherwise
+    return None. An exact match rather than "sidecar is newer": a CSV replaced
+    by a file with an older mtime (cp -p, rsync -t) must not serve stale data.
+    """
+    side = _sidecar_path(csv_path)
+    try:
+        source = _sidecar_source(csv_path.stat())
+        table = pa_ipc.open_file(pa.memory_map(str(side), "r")).read_all()
+    except (OSError, pa.ArrowException):
+        return None
+    metadata = table.schema.metadata or {}
+    if metadata.get(_SIDECAR_SOURCE_KEY) != source or metadata.get(_SIDECAR_OPTIONS_KEY) != _sidecar_tag(read_kwargs):
+        return None
+    if read_kwargs.get("dtype_backend") == "pyarrow":
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return table.to_pandas()
+
+
+def _write_sidecar(csv_path: Path, read_kwargs: Dict[str, Any], df: pd.DataFrame, st: os.stat_result) -> None:
+    """
+    Write df next to csv_path as an uncompressed (mappable) Arrow IPC file,
+    tagged with st, the CSV's stat from before it was parsed.
+    """
+    side = _sidecar_path(csv_path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_SIDECAR_OPTIONS_KEY] = _sidecar_tag(read_kwargs)
+    metadata[_SIDECAR_SOURCE_KEY] = _sidecar_source(st)
+    table = table.replace_schema_metadata(metadata)
+
+    tmp = side.with_name(side.name + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, side)
+
+
+class _WorkerPool:
+    """
+    Runs tool bodies on worker threads so pandas work never blocks the event loop
+    (and with it /health and every other session).
+
+    Threads rather than processes: session DataFrames live in this process, and
+    the heavy pandas/NumPy kernels release the GIL.
+
+    At most max_pending calls may be running or queued; beyond that, calls are
+    rejected immediately with a "busy" response instead of piling up.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int) -> None:
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="csv-analyst")
+        self._pending = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable[..., Dict[str, Any]], *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        # Only touched from the event loop thread, so no lock is needed.
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            return {
+                "ok": False,
+                "busy": True,
+                "error": f"Server busy: {self._pending} tool calls in flight. Retry shortly.",
+                "retry_after_seconds": 1,
+            }
+        self._pending += 1
+        try:
+            # Carry the MCP request context over so tools still see their session.
+            ctx = contextvars.copy_context()
+            call = functools.partial(ctx.run, fn, *args, **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "rejected": self._rejected,
+        }
+
+
+WORKERS = _WorkerPool(
+    max_workers=_env_int("CSV_MCP_WORKERS", min(32, (os.cpu_count() or 1) + 4)),
+    max_pending=_env_int("CSV_MCP_MAX_PENDING", 64),
+)
+
+
+def _offloaded(fn: Callable[..., Dict[str, Any]]) -> Callable[..., Any]:
+    """Expose a synchronous tool body as an async tool running on WORKERS."""
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+        return await WORKERS.run(fn, *args, **kwargs)
+
+    return wrapper
+
+
 def _resolve_csv_path(user_path: str) -> Path:
     """
     Resolve and validate a CSV file path.
@@ -64,27 +1047,1946 @@ def _resolve_csv_path(user_path: str) -> Path:
     return p
 
 
-def _ensure_loaded() -> pd.DataFrame:
-    if STATE.df is None:
-        raise RuntimeError("No CSV loaded. Call load_csv first.")
-    return STATE.df
+def _current_session_id() -> str:
+    """
+    The mcp-session-id of the calling client, or a shared default session
+    when a tool is invoked outside of an MCP request (e.g. from scripts).
+    """
+    try:
+        return get_context().session_id
+    except RuntimeError:
+        return _DEFAULT_SESSION_ID
+
+
+def _session() -> _Session:
+    return STATE.sessions.get(_current_session_id())
+
+
+def _ensure_loaded(session: _Session) -> pd.DataFrame:
+    if session.df is None:
+        if session.stream is not None:
+            raise RuntimeError(
+                "The CSV was loaded in streaming mode (chunk_rows), which keeps no DataFrame in memory. "
+                "Call load_csv without chunk_rows to use this tool."
+            )
+        raise RuntimeError("No CSV loaded for this session. Call load_csv first.")
+    return session.df
+
+
+def _column_values(s: pd.Series) -> List[Any]:
+    """
+    One column as JSON-ready Python values, converted in bulk:
+    NaN/NA/NaT become None and timestamps ISO strings.
+    """
+    dtype = s.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        lookup = np.empty(len(dtype.categories) + 1, dtype=object)
+        lookup[:-1] = _column_values(pd.Series(dtype.categories))
+        lookup[-1] = None
+        return lookup[s.cat.codes.to_numpy()].tolist()
+    if pd.api.types.is_datetime64_any_dtype(dtype) or pd.api.types.is_timedelta64_dtype(dtype):
+        # Blanks are NaT in numpy-backed columns but pd.NA in Arrow-backed ones.
+        return [None if pd.isna(v) else v.isoformat() for v in s.to_numpy(dtype=object)]
+    if isinstance(dtype, np.dtype) and dtype.kind in "iub":
+        return s.to_numpy().tolist()
+    if isinstance(dtype, np.dtype) and dtype.kind == "f":
+        arr = s.to_numpy()
+        nan = np.isnan(arr)
+        if not nan.any():
+            return arr.tolist()
+        out = arr.astype(object)
+        out[nan] = None
+        return out.tolist()
+    return s.to_numpy(dtype=object, na_value=None).tolist()
 
 
 def _df_to_rows(df: pd.DataFrame, limit: int) -> List[Dict[str, Any]]:
     if limit <= 0:
         return []
     out = df.head(limit)
-    return out.to_dict(orient="records")
+    columns = [str(c) for c in out.columns]
+    values = [_column_values(out.iloc[:, i]) for i in range(out.shape[1])]
+    return [dict(zip(columns, row)) for row in zip(*values)] if values else [{} for _ in range(len(out))]
 
 
-def _basic_profile(df: pd.DataFrame) -> Dict[str, Any]:
+def _df_to_table(df: pd.DataFrame, limit: int) -> Dict[str, Any]:
+    """Columnar encoding: column names once, then one value array per column."""
+    out = df.head(max(limit, 0))
     return {
+        "columns": [str(c) for c in out.columns],
+        "data": [_column_values(out.iloc[:, i]) for i in range(out.shape[1])],
+    }
+
+
+_RESULT_FORMATS = ["records", "columnar"]
+
+
+def _rows_payload(df: pd.DataFrame, limit: int, result_format: str) -> Dict[str, Any]:
+    """
+    Result rows in the requested format: {"rows": [{column: value}, ...]} or
+    {"columns": [...], "data": [[column values], ...]}.
+    """
+    if result_format == "columnar":
+        return _df_to_table(df, limit)
+    return {"rows": _df_to_rows(df, limit)}
+
+
+def _cursor_fields(session: _Session, result: _CursorResult, returned: int) -> Dict[str, Any]:
+    """
+    {"cursor", "next_offset"} for a result whose first `returned` rows are in
+    the response; cursor is None when nothing is left to fetch.
+    """
+    if returned >= _result_row_count(result):
+        return {"cursor": None, "next_offset": None}
+    return {"cursor": session.cursors.open(result), "next_offset": returned}
+
+
+def _basic_profile(dataset: _Dataset) -> Dict[str, Any]:
+    df = dataset.df
+    stats = dataset.stats
+    profile = {
         "row_count": int(df.shape[0]),
         "column_count": int(df.shape[1]),
         "columns": list(df.columns),
         "dtypes": {c: str(df[c].dtype) for c in df.columns},
-        "missing_by_column": {c: int(df[c].isna().sum()) for c in df.columns},
+        "missing_by_column": dict(stats.nulls) if stats else {c: int(df[c].isna().sum()) for c in df.columns},
+        "memory_bytes": dataset.nbytes,
+        "dictionary_encoded": dict(dataset.encoded),
+        "memory_saved_bytes": int(sum(dataset.encoded.values())),
     }
+    if stats:
+        profile["column_statistics"] = stats.summary()
+    return profile
+
+
+_TEXT_OPS = ("contains", "startswith", "endswith")
+
+
+def _normalized_text(series: pd.Series, lower: bool) -> pd.Series:
+    """series as the string dtype text predicates match against."""
+    s = series.astype("string")
+    return s.str.lower() if lower else s
+
+
+def _text_match(s: pd.Series, op: str, needle: str, regex: bool = False) -> pd.Series:
+    """
+    A contains/startswith/endswith predicate over normalized text s. contains
+    matches needle literally unless regex is set.
+    """
+    if op == "contains":
+        return s.str.contains(needle, regex=regex, na=False)
+    if op == "startswith":
+        return s.str.startswith(needle, na=False)
+    return s.str.endswith(needle, na=False)
+
+
+def _predicate(
+    series: pd.Series, col: str, op: Any, val: Any, case_sensitive: bool, regex: bool = False
+) -> pd.Series:
+    """Evaluate one structured filter over series as a boolean Series."""
+    if op in ["==", "!=", ">", ">=", "<", "<="]:
+        ops = {
+            "==": series.eq,
+            "!=": series.ne,
+            ">": series.gt,
+            ">=": series.ge,
+            "<": series.lt,
+            "<=": series.le,
+        }
+        try:
+            return ops[op](val)
+        except Exception as e:
+            raise ValueError(f"Comparison failed for {col} {op} {val}: {e}")
+
+    if op in _TEXT_OPS:
+        needle = str(val)
+        if not case_sensitive:
+            needle = needle.lower()
+        return _text_match(_normalized_text(series, not case_sensitive), op, needle, regex)
+
+    if op == "in":
+        if not isinstance(val, list):
+            raise ValueError("For op='in', value must be a list.")
+        return series.isin(val)
+
+    raise ValueError(f"Unsupported op: {op}")
+
+
+def _categorical_predicate(
+    series: pd.Series, col: str, op: Any, val: Any, case_sensitive: bool, regex: bool = False
+) -> pd.Series:
+    """
+    _predicate for a categorical column: evaluate it once per category, then
+    expand to rows through the integer codes.
+    """
+    hits = _predicate(pd.Series(series.cat.categories), col, op, val, case_sensitive, regex).to_numpy(dtype=bool)
+    # Code -1 (missing) maps to the extra last slot: missing values only match
+    # "!=" (as with NaN != x) or an "in" list that contains a missing value.
+    missing_hit = op == "!=" or (op == "in" and any(pd.isna(v) for v in val))
+    lookup = np.append(hits, missing_hit)
+    return pd.Series(lookup[series.cat.codes.to_numpy()], index=series.index)
+
+
+_FILTER_OPS = {"==", "!=", ">", ">=", "<", "<=", "contains", "startswith", "endswith", "in"}
+_FILTER_GROUPS = ("and", "or", "not")
+
+
+# (column, op, value, case_sensitive, regex)
+_FilterStep = Tuple[str, Any, Any, bool, bool]
+
+
+class _FilterNode:
+    """
+    One node of a compiled filter expression: a predicate ("pred") or an
+    "and" / "or" / "not" group over child nodes.
+
+    key identifies the node by value, so repeated predicates or groups anywhere
+    in the tree compare equal; shared is set when a key occurs more than once.
+    """
+
+    def __init__(self, kind: str, children: List["_FilterNode"], step: Optional[_FilterStep] = None):
+        self.kind = kind
+        self.children = children
+        self.step = step
+        if step is not None:
+            self.key: Tuple[Any, ...] = (kind, *step[:2], json.dumps(step[2], sort_keys=True, default=str), *step[3:])
+        else:
+            # and/or are commutative: children in any order give the same key.
+            keys = [c.key for c in children]
+            self.key = (kind, *(keys if kind == "not" else sorted(keys, key=repr)))
+        self.shared = False
+        self.cost = 0.0
+        self.selectivity = 0.5
+        # Set on predicates that column statistics prove true/false on every row.
+        self.constant: Optional[bool] = None
+
+    def walk(self) -> Iterator["_FilterNode"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def explain(self) -> str:
+        if self.step is not None:
+            return f"{self.step[0]} {self.step[1]} {self.step[2]!r}"
+        if self.kind == "not":
+            return f"not {self.children[0].explain()}"
+        return "(" + f" {self.kind} ".join(c.explain() for c in self.children) + ")"
+
+
+def _parse_filter(spec: Any, columns: Any) -> _FilterNode:
+    """
+    Validate one filter spec: a condition {"column", "op", "value", ...} or a
+    group {"and": [...]}, {"or": [...]} or {"not": <filter>}.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"Each filter must be an object (a condition or an and/or/not group), got: {spec!r}")
+    groups = [k for k in _FILTER_GROUPS if k in spec]
+    if groups:
+        if len(spec) != 1:
+            raise ValueError(f"A filter group must have exactly one key, 'and', 'or' or 'not': {spec}")
+        kind = groups[0]
+        body = spec[kind]
+        if kind == "not":
+            return _FilterNode("not", [_parse_filter(body, columns)])
+        if not isinstance(body, list) or not body:
+            raise ValueError(f"'{kind}' must be a non-empty list of filters.")
+        return _FilterNode(kind, [_parse_filter(c, columns) for c in body])
+
+    col = spec.get("column")
+    op = spec.get("op")
+    val = spec.get("value")
+    if not col or col not in columns:
+        raise ValueError(f"Unknown or missing column in filter: {col}")
+    if op not in _FILTER_OPS:
+        raise ValueError(f"Unsupported op: {op}")
+    if op == "in" and not isinstance(val, list):
+        raise ValueError("For op='in', value must be a list.")
+    step = (col, op, val, bool(spec.get("case_sensitive", False)), bool(spec.get("regex", False)))
+    return _FilterNode("pred", [], step)
+
+
+class _FilterPlan:
+    """
+    A filter expression compiled for one DataFrame layout.
+
+    The top-level filter list is an implicit group combined by `logic`; any
+    entry may itself be an and/or/not group, nested to any depth.
+
+    Within each group, children are ranked by estimated selectivity (measured
+    on an evenly spaced sample of rows, or read off the column statistics'
+    histogram for range predicates) and relative cost, so the ones that
+    decide the most rows per unit of work run first. Predicates whose
+    column's min/max show they match every row or none are not evaluated. Each later child is
+    evaluated only on the rows still undecided: survivors for "and",
+    non-matches for "or". Predicates or groups that occur more than once in
+    the tree are evaluated once over the full frame and shared.
+
+    A plan is immutable once compiled; evaluation keeps its state in locals,
+    so one plan serves concurrent queries.
+    """
+
+    _SAMPLE_ROWS = 2048
+    # Cost per source row of locating the undecided rows (np.flatnonzero) and
+    # per undecided row of gathering them, relative to a numeric comparison.
+    _LOCATE_COST = 2.5
+    _GATHER_COST = 8.0
+    # Cost per row of filling in the result of a predicate settled by statistics.
+    _CONSTANT_COST = 0.1
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        filters: List[Dict[str, Any]],
+        logic: str,
+        indexed: Tuple[Tuple[str, str], ...] = (),
+        stats: Optional["_ColumnStatistics"] = None,
+    ) -> None:
+        self.indexed = indexed
+        self.stats = stats
+        children = [_parse_filter(f, df.columns) for f in filters]
+        self.root: Optional[_FilterNode] = _FilterNode(logic, children) if children else None
+        if self.root is None:
+            return
+
+        counts: Dict[Tuple[Any, ...], int] = {}
+        for node in self.root.walk():
+            counts[node.key] = counts.get(node.key, 0) + 1
+        for node in self.root.walk():
+            node.shared = counts[node.key] > 1
+
+        n = int(df.shape[0])
+        sample = df.iloc[np.linspace(0, n - 1, min(n, self._SAMPLE_ROWS)).astype(np.int64)] if n else df
+        # Evaluating the sample also surfaces invalid comparisons up front,
+        # even if short-circuiting later skips a predicate entirely.
+        self._rank(self.root, df, sample)
+
+    def mask(
+        self,
+        df: pd.DataFrame,
+        cache: Optional["_ColumnCache"] = None,
+        timings: Optional[Dict[str, Any]] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        Boolean row mask over df (None: no filters).
+
+        With cache, predicates use df's indexes there and text predicates its
+        normalized columns; timings then receives index_hits,
+        text_normalize_seconds and text_cache_hits.
+        """
+        if self.root is None:
+            return None
+        return self._eval(self.root, _FilterRun(df, cache, timings), None)
+
+    def explain(self) -> str:
+        """The evaluation order, e.g. "(Salary > 1 and (Status == 'x' or ...))"."""
+        return self.root.explain() if self.root is not None else ""
+
+    def _rank(self, node: _FilterNode, df: pd.DataFrame, sample: pd.DataFrame) -> np.ndarray:
+        """Estimate cost and selectivity bottom-up and order group children."""
+        estimate: Optional[float] = None
+        if node.kind == "pred":
+            hits = self._predicate(_FilterRun(sample), None, node.step)
+            col, op, val, _, regex = node.step
+            costs = [
+                _INDEX_TYPES[kind].COST for c, kind in self.indexed if c == col and _INDEX_TYPES[kind].serves(op, regex)
+            ]
+            node.cost = min(costs) if costs else self._cost(df[col].dtype, op)
+            if self.stats is not None:
+                node.constant = self.stats.decide(col, op, val)
+                estimate = self.stats.selectivity(col, op, val)
+            if node.constant is not None:
+                node.cost, estimate = self._CONSTANT_COST, float(node.constant)
+        elif node.kind == "not":
+            hits = ~self._rank(node.children[0], df, sample)
+            node.cost = node.children[0].cost
+        else:
+            child_hits = [self._rank(c, df, sample) for c in node.children]
+            combine = np.logical_or if node.kind == "or" else np.logical_and
+            hits = functools.reduce(combine, child_hits)
+            node.cost = sum(c.cost for c in node.children)
+
+            def rank(child: _FilterNode) -> float:
+                decided = child.selectivity if node.kind == "or" else 1.0 - child.selectivity
+                return -decided / child.cost
+
+            order = sorted(range(len(node.children)), key=lambda i: (rank(node.children[i]), i))
+            node.children = [node.children[i] for i in order]
+        if estimate is None:
+            estimate = float(hits.mean()) if len(hits) else 0.5
+        node.selectivity = estimate
+        return hits
+
+    def _eval(self, node: _FilterNode, run: "_FilterRun", rows: Optional[np.ndarray]) -> np.ndarray:
+        """node over rows `rows` (None: all rows) as a fresh boolean array."""
+        if node.shared:
+            full = run.shared.get(node.key)
+            if full is None:
+                full = run.shared[node.key] = self._eval_node(node, run, None)
+            return full.copy() if rows is None else full[rows]
+        return self._eval_node(node, run, rows)
+
+    def _eval_node(self, node: _FilterNode, run: "_FilterRun", rows: Optional[np.ndarray]) -> np.ndarray:
+        if node.kind == "pred":
+            if node.constant is not None:
+                return np.full(int(run.df.shape[0]) if rows is None else len(rows), node.constant)
+            return self._predicate(run, rows, node.step)
+        if node.kind == "not":
+            return ~self._eval(node.children[0], run, rows)
+
+        n = int(run.df.shape[0]) if rows is None else len(rows)
+        # Rows equal to `decided` are final: False under "and", True under "or".
+        decided = node.kind == "or"
+        mask: Optional[np.ndarray] = None
+        for child in node.children:
+            if mask is None:
+                mask = self._eval(child, run, rows)
+                continue
+            hits = int(np.count_nonzero(mask))
+            undecided = n - hits if decided else hits
+            if undecided == 0:
+                break
+            # Evaluate only the undecided rows when that is cheaper than a full pass.
+            if n * self._LOCATE_COST + undecided * (child.cost + self._GATHER_COST) < n * child.cost:
+                sub = np.flatnonzero(~mask if decided else mask)
+                mask[sub] = self._eval(child, run, sub if rows is None else rows[sub])
+            elif decided:
+                mask |= self._eval(child, run, rows)
+            else:
+                mask &= self._eval(child, run, rows)
+        return mask
+
+    @staticmethod
+    def _predicate(run: "_FilterRun", rows: Optional[np.ndarray], step: _FilterStep) -> np.ndarray:
+        col, op, val, case_sensitive, regex = step
+        series = run.df[col]
+        categorical = isinstance(series.dtype, pd.CategoricalDtype)
+        if run.cache is not None:
+            for _, index in run.cache.indexes(run.df, col):
+                m = index.match(op, val, case_sensitive, rows) if index.serves(op, regex) else None
+                if m is not None:
+                    run.timings["index_hits"] = run.timings.get("index_hits", 0) + 1
+                    return m
+        if run.cache is not None and op in _TEXT_OPS and not categorical:
+            series = run.cache.get(run.df, col, not case_sensitive, run.timings)
+            needle = str(val) if case_sensitive else str(val).lower()
+            if rows is not None:
+                series = pd.Series(series.array[rows], name=col)
+            m = _text_match(series, op, needle, regex)
+        else:
+            if rows is not None:
+                # Gather the backing array: cheaper than Series.iloc, which also
+                # takes the index.
+                series = pd.Series(series.array[rows], name=col)
+            m = _categorical_predicate(series, *step) if categorical else _predicate(series, *step)
+        # Missing (NA) results count as no match, as in the final row selection.
+        out = m.to_numpy(dtype=bool, na_value=False)
+        return out if out.flags.writeable else out.copy()
+
+    @staticmethod
+    def _cost(dtype: Any, op: str) -> float:
+        """
+        Rough cost per row of evaluating op over a column of dtype, relative to
+        a numeric comparison (measured on 1M-row columns).
+        """
+        if isinstance(dtype, pd.CategoricalDtype):
+            # One evaluation per category, then a lookup through the codes.
+            return 5.0
+        text = not (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype))
+        if op == "contains":
+            return 120.0
+        if op in ("startswith", "endswith"):
+            return 40.0
+        if op == "in":
+            return 30.0 if text else 20.0
+        return 10.0 if text else 1.0
+
+
+class _FilterRun:
+    """Per-call evaluation state of a _FilterPlan."""
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        cache: Optional["_ColumnCache"] = None,
+        timings: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.df = df
+        self.cache = cache
+        self.timings = timings if timings is not None else {}
+        # Full-frame results of shared nodes, by node key.
+        self.shared: Dict[Tuple[Any, ...], np.ndarray] = {}
+
+
+class _TrigramIndex:
+    """
+    Substring index over one text column, for literal contains / startswith /
+    endswith.
+
+    Rows are factorized to distinct values first, so a search only touches
+    each distinct value once. For needles of 3+ characters, the postings of
+    the needle's rarest (lowercased) trigrams are intersected to find the
+    candidate values, which are then verified exactly; matching values expand
+    to rows through the codes, as for categoricals.
+
+    A trigram is stored as one uint64: three 21-bit Unicode code points.
+    """
+
+    kind = "trigram"
+    # Relative cost per row for _FilterPlan: a lookup through the codes.
+    COST = 5.0
+    # Trigrams intersected per search; the rest is left to verification.
+    _MAX_GRAMS = 4
+    # Cells (values x characters) per block while extracting trigrams.
+    _BLOCK_CELLS = 4_000_000
+
+    def __init__(self, series: pd.Series) -> None:
+        codes, uniques = pd.factorize(_normalized_text(series, False))
+        self.codes = codes.astype(np.int32 if len(uniques) < 2**31 - 1 else np.int64)
+        self.values = pd.Series(uniques, dtype="string")
+        # Lowercased the same way as the scan path, so both agree on Unicode.
+        self.lowered = self.values.str.lower()
+        self.distinct_values = len(uniques)
+
+        lowered = self.lowered.to_numpy(dtype=object)
+        lengths = np.fromiter(map(len, lowered), dtype=np.int64, count=len(lowered))
+        by_length = np.argsort(lengths, kind="stable")
+        by_length = by_length[lengths[by_length] >= 3]
+        keys: List[np.ndarray] = []
+        owners: List[np.ndarray] = []
+        start = 0
+        while start < len(by_length):
+            width = int(lengths[by_length[start]])
+            stop = start + 1
+            while stop < len(by_length) and int(lengths[by_length[stop]]) * (stop - start + 1) <= max(
+                self._BLOCK_CELLS, width
+            ):
+                stop += 1
+            ids = by_length[start:stop]
+            width = int(lengths[ids[-1]])
+            points = np.array(lowered[ids].tolist(), dtype=f"<U{width}").view(np.uint32).reshape(len(ids), width)
+            grams = self._gram_keys(points)
+            valid = np.arange(width - 2) < (lengths[ids] - 2)[:, None]
+            keys.append(grams[valid])
+            owners.append(np.repeat(ids, valid.sum(axis=1)))
+            start = stop
+
+        all_keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.uint64)
+        all_ids = np.concatenate(owners) if owners else np.empty(0, dtype=np.int64)
+        order = np.lexsort((all_ids, all_keys))
+        all_keys, all_ids = all_keys[order], all_ids[order]
+        # Drop repeated trigrams within one value.
+        keep = np.ones(len(all_keys), dtype=bool)
+        keep[1:] = (all_keys[1:] != all_keys[:-1]) | (all_ids[1:] != all_ids[:-1])
+        all_keys, all_ids = all_keys[keep], all_ids[keep]
+        starts = np.flatnonzero(np.r_[True, all_keys[1:] != all_keys[:-1]]) if len(all_keys) else np.empty(0, np.int64)
+        self._keys = all_keys[starts]
+        self._bounds = np.r_[starts, len(all_keys)]
+        self._ids = all_ids.astype(self.codes.dtype)
+        self.nbytes = int(
+            self.codes.nbytes
+            + self._ids.nbytes
+            + self._keys.nbytes
+            + self._bounds.nbytes
+            + self.values.memory_usage(index=False, deep=True)
+            + self.lowered.memory_usage(index=False, deep=True)
+        )
+
+    @staticmethod
+    def serves(op: Any, regex: bool) -> bool:
+        return op in _TEXT_OPS and not regex
+
+    def match(self, op: str, val: Any, case_sensitive: bool, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Boolean mask over the column (or over `rows` of it)."""
+        needle = str(val)
+        values = self.values if case_sensitive else self.lowered
+        if not case_sensitive:
+            needle = needle.lower()
+        # Lowercasing an ASCII needle commutes with substring matching, so the
+        # lowercase postings are safe to use for case-sensitive searches too.
+        candidates = self._candidates(needle.lower()) if not case_sensitive or needle.isascii() else None
+        # The extra last slot is code -1 (missing): never a match.
+        lookup = np.zeros(len(values) + 1, dtype=bool)
+        if candidates is None:
+            lookup[:-1] = _text_match(values, op, needle).to_numpy(dtype=bool)
+        elif len(candidates):
+            hits = _text_match(values.take(candidates), op, needle).to_numpy(dtype=bool)
+            lookup[candidates[hits]] = True
+        return lookup[self.codes if rows is None else self.codes[rows]]
+
+    def _candidates(self, needle: str) -> Optional[np.ndarray]:
+        """Ids of values containing the needle's rarest trigrams (None: too short to narrow)."""
+        if len(needle) < 3:
+            return None
+        points = np.array([needle], dtype=f"<U{len(needle)}").view(np.uint32).reshape(1, -1)
+        grams = np.unique(self._gram_keys(points)[0])
+        pos = np.searchsorted(self._keys, grams)
+        if (pos >= len(self._keys)).any() or (self._keys[np.minimum(pos, len(self._keys) - 1)] != grams).any():
+            return np.empty(0, dtype=np.int64)
+        sizes = self._bounds[pos + 1] - self._bounds[pos]
+        rarest = pos[np.argsort(sizes, kind="stable")[: self._MAX_GRAMS]]
+        first = self._ids[self._bounds[rarest[0]] : self._bounds[rarest[0] + 1]]
+        if len(rarest) == 1:
+            return first
+        counts = np.zeros(len(self.values), dtype=np.uint8)
+        for p in rarest:
+            counts[self._ids[self._bounds[p] : self._bounds[p + 1]]] += 1
+        return np.flatnonzero(counts == len(rarest))
+
+    @staticmethod
+    def _gram_keys(points: np.ndarray) -> np.ndarray:
+        """Trigram keys of each row of a (values x characters) code point matrix."""
+        p = points.astype(np.uint64)
+        return (p[:, :-2] << np.uint64(42)) | (p[:, 1:-1] << np.uint64(21)) | p[:, 2:]
+
+
+def _missing_matches_ne(series: pd.Series, missing: np.ndarray) -> bool:
+    """Whether series' missing values match "!=" (NaN: yes, pd.NA: no)."""
+    present = np.flatnonzero(series.notna().to_numpy(dtype=bool))
+    if not len(missing) or not len(present):
+        return False
+    probe = series.iloc[[int(missing[0])]]
+    return bool(probe.ne(series.iloc[int(present[0])]).to_numpy(dtype=bool, na_value=False)[0])
+
+
+def _is_missing_value(v: Any) -> bool:
+    return pd.api.types.is_scalar(v) and bool(pd.isna(v))
+
+
+class _HashIndex:
+    """
+    Equality index over one column: the row positions of every distinct
+    value, grouped by value, behind a hash lookup of the values.
+
+    Serves ==, != and in by gathering the rows of the requested values only.
+    """
+
+    kind = "hash"
+    # Relative cost per row for _FilterPlan: allocating the mask dominates.
+    COST = 0.5
+
+    def __init__(self, series: pd.Series) -> None:
+        codes, uniques = pd.factorize(series)
+        self._lookup = pd.Index(uniques)
+        self._bool = pd.api.types.is_bool_dtype(series.dtype)
+        self._n = int(series.shape[0])
+        position = np.int32 if self._n < 2**31 - 1 else np.int64
+        # Rows sorted by code; group g (code g - 1, so missing first) is
+        # _rows[_bounds[g]:_bounds[g + 1]].
+        self._rows = np.argsort(codes, kind="stable").astype(position)
+        self._bounds = np.r_[0, np.cumsum(np.bincount(codes + 1, minlength=len(uniques) + 1))]
+        self._missing_ne = _missing_matches_ne(series, self._rows[: self._bounds[1]])
+        self.distinct_values = len(uniques)
+        self.nbytes = int(
+            self._rows.nbytes + self._bounds.nbytes + self._lookup.memory_usage(deep=True)
+        )
+
+    @staticmethod
+    def serves(op: Any, regex: bool) -> bool:
+        return op in ("==", "!=", "in")
+
+    def match(
+        self, op: str, val: Any, case_sensitive: bool, rows: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
+        """Boolean mask over the column (or over `rows` of it); None: not answerable here."""
+        values = list(val) if op == "in" else [val]
+        # Whether missing values match a missing needle, and whether True
+        # equals 1, depends on the dtype: leave those to the scan.
+        if any(_is_missing_value(v) or isinstance(v, (bool, np.bool_)) != self._bool for v in values):
+            return None
+        try:
+            codes = self._lookup.get_indexer(values)
+        except (TypeError, ValueError):
+            return None
+
+        mask = np.zeros(self._n, dtype=bool)
+        for group in np.unique(codes[codes >= 0]) + 1:
+            mask[self._rows[self._bounds[group] : self._bounds[group + 1]]] = True
+        if op == "!=":
+            mask = ~mask
+            mask[self._rows[: self._bounds[1]]] = self._missing_ne
+        return mask if rows is None else mask[rows]
+
+
+class _SortedIndex:
+    """
+    Range index over one numeric or datetime column: row positions ordered by
+    value, so comparisons become two binary searches and a slice.
+
+    Serves ==, !=, >, >=, <, <= and in. Values it cannot compare exactly
+    (text, missing values, tz-aware timestamps) fall back to a scan.
+    """
+
+    kind = "sorted"
+    # Relative cost per row for _FilterPlan: allocating the mask dominates.
+    COST = 0.5
+
+    def __init__(self, series: pd.Series) -> None:
+        dtype = series.dtype
+        numpy_dtype = dtype if isinstance(dtype, np.dtype) else getattr(dtype, "numpy_dtype", None)
+        if numpy_dtype is None or np.dtype(numpy_dtype).kind not in "biufM":
+            raise ValueError(
+                f"kind='sorted' needs a numeric or datetime column ({series.name} is {dtype}); "
+                "use 'hash' or 'trigram' for text."
+            )
+        valid = series.notna().to_numpy(dtype=bool)
+        present = np.flatnonzero(valid)
+        values = series.iloc[present].to_numpy(dtype=numpy_dtype)
+        order = np.argsort(values, kind="stable")
+        self._n = int(series.shape[0])
+        position = np.int32 if self._n < 2**31 - 1 else np.int64
+        self._sorted = values[order]
+        self._rows = present[order].astype(position)
+        self._missing = np.flatnonzero(~valid).astype(position)
+        self._missing_ne = _missing_matches_ne(series, self._missing)
+        self._datetime = self._sorted.dtype.kind == "M"
+        # pandas parses strings compared against NumPy datetimes, not Arrow ones.
+        self._parse_strings = isinstance(dtype, np.dtype)
+        self.distinct_values = int(np.count_nonzero(self._sorted[1:] != self._sorted[:-1]) + 1) if len(values) else 0
+        self.nbytes = int(self._sorted.nbytes + self._rows.nbytes + self._missing.nbytes)
+
+    @staticmethod
+    def serves(op: Any, regex: bool) -> bool:
+        return op in ("==", "!=", ">", ">=", "<", "<=", "in")
+
+    def match(
+        self, op: str, val: Any, case_sensitive: bool, rows: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
+        """Boolean mask over the column (or over `rows` of it); None: not answerable here."""
+        keys = [self._key(v) for v in (val if op == "in" else [val])]
+        if any(k is None for k in keys):
+            return None
+
+        mask = np.zeros(self._n, dtype=bool)
+        if op == "in":
+            for k in keys:
+                mask[self._rows[self._span(k)]] = True
+            return mask if rows is None else mask[rows]
+
+        eq = self._span(keys[0])
+        selected = {
+            "==": eq,
+            "!=": eq,
+            ">": slice(eq.stop, None),
+            ">=": slice(eq.start, None),
+            "<": slice(None, eq.start),
+            "<=": slice(None, eq.stop),
+        }[op]
+        mask[self._rows[selected]] = True
+        if op == "!=":
+            mask = ~mask
+            mask[self._missing] = self._missing_ne
+        return mask if rows is None else mask[rows]
+
+    def _span(self, key: Any) -> slice:
+        lo = int(np.searchsorted(self._sorted, key, side="left"))
+        hi = int(np.searchsorted(self._sorted, key, side="right"))
+        return slice(lo, hi)
+
+    def _key(self, v: Any) -> Any:
+        """v as a search key for the sorted values (None: compare by scan instead)."""
+        if self._datetime:
+            if isinstance(v, (bool, int, float)) or (isinstance(v, str) and not self._parse_strings):
+                return None
+            try:
+                ts = pd.Timestamp(v)
+            except (TypeError, ValueError):
+                return None
+            if ts is pd.NaT or ts.tz is not None:
+                return None
+            return ts.to_datetime64()
+        if isinstance(v, (bool, np.bool_)) and self._sorted.dtype.kind != "b":
+            return None
+        if isinstance(v, (int, float, np.number)) and not _is_missing_value(v):
+            return v
+        return None
+
+
+_INDEX_TYPES: Dict[str, Any] = {"trigram": _TrigramIndex, "hash": _HashIndex, "sorted": _SortedIndex}
+_INDEX_KINDS = list(_INDEX_TYPES)
+_ColumnIndex = Union[_TrigramIndex, _HashIndex, _SortedIndex]
+
+
+class _RangeExecutor:
+    """
+    Runs row-wise work over an in-memory frame as contiguous row ranges on a
+    dedicated thread pool, for groupby_aggregate's partitioned execution.
+
+    A separate pool rather than WORKERS: tool bodies already run there and would
+    end up waiting on themselves. Threads rather than processes for the same
+    reason as WORKERS; the bincount / ufunc.at / factorize kernels run per range
+    release the GIL. Frames with fewer than 2 * min_rows rows run as a single
+    range on the calling thread.
+    """
+
+    def __init__(self, threads: int, min_rows: int) -> None:
+        self.threads = max(1, threads)
+        self.min_rows = max(1, min_rows)
+        self._executor = (
+            ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="csv-analyst-range")
+            if self.threads > 1
+            else None
+        )
+
+    def ranges(self, n_rows: int) -> List[Tuple[int, int]]:
+        parts = max(1, min(self.threads, n_rows // self.min_rows))
+        bounds = np.linspace(0, n_rows, parts + 1).astype(np.int64).tolist()
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def map(self, fn: Callable[[int, int], Any], ranges: List[Tuple[int, int]]) -> List[Any]:
+        if self._executor is None or len(ranges) == 1:
+            return [fn(lo, hi) for lo, hi in ranges]
+        return list(self._executor.map(lambda r: fn(*r), ranges))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"threads": self.threads, "min_rows": self.min_rows}
+
+
+RANGES = _RangeExecutor(
+    threads=_env_int("CSV_MCP_GROUPBY_THREADS", min(8, os.cpu_count() or 1)),
+    min_rows=_env_int("CSV_MCP_GROUPBY_RANGE_ROWS", 500_000),
+)
+
+
+def _factorize(series: pd.Series, pool: _RangeExecutor) -> Tuple[np.ndarray, pd.Index]:
+    """
+    pd.factorize(series): (codes, -1 for missing values; distinct values in
+    order of first appearance), factorized per row range and renumbered
+    through the distinct values of all ranges.
+    """
+    ranges = pool.ranges(len(series))
+    if len(ranges) == 1:
+        codes, uniques = pd.factorize(series)
+        return codes, pd.Index(uniques)
+    parts = pool.map(lambda lo, hi: pd.factorize(series.iloc[lo:hi]), ranges)
+    # Index.append keeps the values' dtype, where concatenating arrays may not.
+    merged = functools.reduce(lambda a, b: a.append(b), [pd.Index(uniques) for _, uniques in parts])
+    global_codes, global_uniques = pd.factorize(merged)
+    codes = np.empty(len(series), dtype=np.intp)
+    offset = 0
+    for (lo, hi), (local, uniques) in zip(ranges, parts):
+        # A trailing -1, so missing values (local code -1) stay -1.
+        lookup = np.append(global_codes[offset : offset + len(uniques)], -1)
+        codes[lo:hi] = lookup[local]
+        offset += len(uniques)
+    return codes, pd.Index(global_uniques)
+
+
+# Partial results computed per row range for each kernel aggregation, merged
+# across ranges with _KERNEL_MERGE. mean is carried as a float sum + count.
+_KERNEL_PARTS = {
+    "sum": ["sum"],
+    "count": ["count"],
+    "mean": ["fsum", "count"],
+    "min": ["min", "count"],
+    "max": ["max", "count"],
+}
+_KERNEL_MERGE = {"sum": np.add, "fsum": np.add, "count": np.add, "min": np.fmin, "max": np.fmax}
+
+
+class _GroupPartition:
+    """
+    Factorized group keys of one DataFrame: the group id of every row and the
+    distinct keys, numbered in the order df.groupby(group_columns,
+    dropna=False, observed=True) returns them.
+
+    Aggregations run as bincount / ufunc.at kernels over the ids, so another
+    aggregation on the same grouping does not hash the keys again. Columns or
+    aggregations without a kernel (extension dtypes, datetimes, min/max of
+    text) are grouped by the ids with pandas, which is still cheaper than
+    grouping by the original keys.
+
+    With a _RangeExecutor, large frames are processed in row ranges on its
+    threads: each range groups its own rows and the local keys are merged into
+    the global numbering; aggregations compute per-range partials (sums,
+    counts, min/max, distinct (group, value) pairs) that are merged at the end.
+    """
+
+    # nunique deduplicates (group, value) pairs in a bitmap of at most this
+    # many entries, and by hashing the pairs beyond it.
+    BITMAP_MAX = 1 << 26
+
+    def __init__(self, df: pd.DataFrame, group_columns: List[str], pool: Optional[_RangeExecutor] = None) -> None:
+        ranges = pool.ranges(int(df.shape[0])) if pool is not None else [(0, int(df.shape[0]))]
+        if len(ranges) == 1:
+            self.keys, ids = self._group(df, group_columns)
+        else:
+            parts = pool.map(lambda lo, hi: self._group(df.iloc[lo:hi], group_columns), ranges)
+            local_keys = pd.concat([keys for keys, _ in parts], ignore_index=True)
+            self.keys, global_ids = self._group(local_keys, group_columns)
+            ids = np.empty(int(df.shape[0]), dtype=np.intp)
+            offset = 0
+            for (lo, hi), (keys, local) in zip(ranges, parts):
+                ids[lo:hi] = global_ids[offset : offset + len(keys)][local]
+                offset += len(keys)
+        # intp, so bincount and ufunc.at do not convert the ids on every call.
+        self.ids = ids.astype(np.intp, copy=False)
+        self.counts = np.bincount(self.ids, minlength=len(self.keys))
+        self.nbytes = int(self.ids.nbytes + self.counts.nbytes + self.keys.memory_usage(index=False, deep=True).sum())
+
+    @staticmethod
+    def _group(df: pd.DataFrame, group_columns: List[str]) -> Tuple[pd.DataFrame, np.ndarray]:
+        """(distinct keys in groupby order, group id of every row)."""
+        groups = df.groupby(group_columns, dropna=False, observed=True)
+        return groups.size().index.to_frame(index=False), groups.ngroup().to_numpy()
+
+    def aggregate(
+        self,
+        df: pd.DataFrame,
+        agg_map: Dict[str, List[str]],
+        rows: Optional[np.ndarray] = None,
+        cache: Optional["_ColumnCache"] = None,
+        pool: Optional[_RangeExecutor] = None,
+    ) -> pd.DataFrame:
+        """
+        The grouped frame (keys, then f"{col}_{fn}" per aggregation) over all
+        rows or, with a boolean rows mask, over those rows only; groups with no
+        selected rows are dropped like observed=True does. With a cache, nunique
+        reuses df's cached value codes; with a pool, large inputs are split
+        into row ranges. Error bounds of approximate aggregations are listed in
+        the frame's attrs["approximate"].
+        """
+        ids, counts, present = self.ids, self.counts, None
+        if rows is not None:
+            ids = ids[rows]
+            counts = np.bincount(ids, minlength=len(self.counts))
+            present = np.flatnonzero(counts)
+        pool = pool or _RangeExecutor(threads=1, min_rows=1)
+        ranges = pool.ranges(len(ids))
+        grouped = self.keys if present is None else self.keys.take(present)
+        out: Dict[str, Any] = {c: grouped[c].array for c in grouped.columns}
+        approximate: Dict[str, Any] = {}
+        for col, fns in agg_map.items():
+            series = df[col] if rows is None else df[col][rows]
+            kernels = [fn for fn in fns if self._has_kernel(series, fn)]
+            needed = {part for fn in kernels for part in _KERNEL_PARTS[fn]}
+            if self._exact_counts(series):
+                needed.discard("count")  # every row counts: the group sizes
+            parts = pool.map(lambda lo, hi: self._partials(series.iloc[lo:hi], ids[lo:hi], needed), ranges)
+            # Binary ufuncs keep the dtype (int32 sums stay int32, like pandas).
+            merged = {part: functools.reduce(_KERNEL_MERGE[part], [p[part] for p in parts]) for part in needed}
+            merged.setdefault("count", counts)
+            for fn in fns:
+                if fn not in kernels and fn not in ("nunique", "approx_nunique"):
+                    values = series
+                    if isinstance(series.dtype, pd.CategoricalDtype) and fn in ("sum", "mean"):
+                        # Dictionary-encoded text: aggregate the values, as before encoding.
+                        values = series.astype(series.cat.categories.dtype)
+                    # Only the present groups, already.
+                    out[f"{col}_{fn}"] = values.groupby(ids, sort=True).agg(fn).array
+                    continue
+                if fn == "approx_nunique":
+                    values, precision = self._approx_nunique(series, ids, ranges, pool)
+                    approximate[f"{col}_{fn}"] = _hll_bound(precision)
+                elif fn == "nunique":
+                    if cache is not None:
+                        codes = cache.codes(df, col)
+                        codes = codes if rows is None else codes[rows]
+                    else:
+                        codes = _factorize(series, pool)[0]
+                    values = self._nunique(codes, ids, ranges, pool)
+                else:
+                    values = self._finish(fn, merged)
+                out[f"{col}_{fn}"] = values if present is None else values[present]
+        frame = pd.DataFrame(out)
+        if approximate:
+            frame.attrs["approximate"] = approximate
+        return frame
+
+    @staticmethod
+    def _exact_counts(series: pd.Series) -> bool:
+        return isinstance(series.dtype, np.dtype) and series.dtype.kind in "iub"
+
+    @staticmethod
+    def _has_kernel(series: pd.Series, fn: str) -> bool:
+        numpy_kind = series.dtype.kind if isinstance(series.dtype, np.dtype) else None
+        if fn == "count":
+            # pandas counts nullable numbers as Int64
+            return numpy_kind is not None or series.dtype.kind not in "iufb"
+        if fn in ("sum", "mean"):
+            return numpy_kind in ("i", "u", "b") or series.dtype == np.float64
+        if fn in ("min", "max"):
+            return numpy_kind in ("i", "u") or series.dtype == np.float64
+        return False
+
+    def _partials(self, series: pd.Series, ids: np.ndarray, needed: set) -> Dict[str, np.ndarray]:
+        """The needed partials over one row range of series (ids: its rows' groups)."""
+        n_groups = len(self.counts)
+        out: Dict[str, np.ndarray] = {}
+        if not needed:
+            return out
+        if "count" in needed:
+            valid = series.notna().to_numpy()
+            out["count"] = np.bincount(ids[valid], minlength=n_groups)
+        if needed == {"count"}:
+            return out
+
+        values = series.to_numpy()
+        if values.dtype.kind == "f":
+            if "sum" in needed or "fsum" in needed:
+                sums = np.bincount(ids, weights=np.where(np.isnan(values), 0.0, values), minlength=n_groups)
+                out["sum"] = out["fsum"] = sums.astype(np.float64)
+            for part in ("min", "max"):
+                if part in needed:
+                    extreme = np.full(n_groups, np.inf if part == "min" else -np.inf)
+                    _KERNEL_MERGE[part].at(extreme, ids, values)
+                    out[part] = extreme
+            return out
+
+        if "fsum" in needed:
+            out["fsum"] = np.bincount(ids, weights=values.astype(np.float64), minlength=n_groups).astype(np.float64)
+        if "sum" in needed:
+            # Like pandas, integer sums keep the column's dtype (bools sum to int64).
+            sums = np.zeros(n_groups, dtype=np.int64 if values.dtype.kind == "b" else values.dtype)
+            np.add.at(sums, ids, values.astype(sums.dtype, copy=False))
+            out["sum"] = sums
+        for part in ("min", "max"):
+            if part in needed:
+                info = np.iinfo(values.dtype)
+                extreme = np.full(n_groups, info.max if part == "min" else info.min, dtype=values.dtype)
+                (np.minimum if part == "min" else np.maximum).at(extreme, ids, values)
+                out[part] = extreme
+        return out
+
+    @staticmethod
+    def _finish(fn: str, merged: Dict[str, np.ndarray]) -> np.ndarray:
+        if fn in ("sum", "count"):
+            return merged[fn]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if fn == "mean":
+                return merged["fsum"] / merged["count"]
+        values = merged[fn]
+        if values.dtype.kind == "f":
+            values = values.copy()
+            values[merged["count"] == 0] = np.nan
+        return values
+
+    def _approx_nunique(
+        self, series: pd.Series, ids: np.ndarray, ranges: List[Tuple[int, int]], pool: _RangeExecutor
+    ) -> Tuple[np.ndarray, int]:
+        """HyperLogLog distinct counts per group, and the precision used."""
+        n_groups = len(self.counts)
+        precision = int(np.clip(np.log2(_HLL_MAX_REGISTERS / max(n_groups, 1)), 4, _HLL_PRECISION))
+        m = 1 << precision
+
+        def registers(lo: int, hi: int) -> np.ndarray:
+            valid, register, rank = _hll_hashes(series.iloc[lo:hi], precision)
+            out = np.zeros(n_groups * m, dtype=np.uint8)
+            np.maximum.at(out, ids[lo:hi][valid] * m + register, rank)
+            return out
+
+        merged = functools.reduce(np.maximum, pool.map(registers, ranges)).reshape(n_groups, m)
+        zeros = (merged == 0).sum(axis=1)
+        return _hll_estimate(np.exp2(-merged.astype(np.float64)).sum(axis=1), zeros, precision), precision
+
+    def _nunique(
+        self, codes: np.ndarray, ids: np.ndarray, ranges: List[Tuple[int, int]], pool: _RangeExecutor
+    ) -> np.ndarray:
+        """Distinct values per group, given the values' factorized codes (-1: missing)."""
+        n_groups = len(self.counts)
+        n_values = int(codes.max()) + 1 if len(codes) else 1
+
+        def pairs(lo: int, hi: int) -> np.ndarray:
+            seen = codes[lo:hi] >= 0
+            return ids[lo:hi][seen] * n_values + codes[lo:hi][seen]
+
+        if n_groups * n_values <= self.BITMAP_MAX:
+            bitmap = np.zeros(n_groups * n_values, dtype=bool)
+
+            def mark(lo: int, hi: int) -> None:
+                bitmap[pairs(lo, hi)] = True  # ranges only ever set bits
+
+            pool.map(mark, ranges)
+            return bitmap.reshape(n_groups, n_values).sum(axis=1)
+        distinct = pool.map(lambda lo, hi: pd.unique(pairs(lo, hi)), ranges)
+        return np.bincount(pd.unique(np.concatenate(distinct)) // n_values, minlength=n_groups)
+
+
+_COLUMN_STATS = _env_int("CSV_MCP_COLUMN_STATS", 1) > 0
+_HISTOGRAM_BUCKETS = 64
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool) and value == value
+
+
+class _ColumnStatistics:
+    """
+    Statistics of every column of a loaded DataFrame, computed once at load and
+    kept with it:
+    - null counts;
+    - distinct counts: HyperLogLog estimates for NumPy numbers and datetimes,
+      exact for everything else (categoricals, text, extension arrays);
+    - min/max of numeric and datetime columns;
+    - for numeric columns, the describe() table (count, mean, std, quartiles)
+      and an equi-depth histogram: the values at _HISTOGRAM_BUCKETS + 1 evenly
+      spaced quantiles, of which the quartiles are three.
+
+    get_schema and describe_numeric read it instead of scanning the frame, and
+    _FilterPlan uses it to settle range predicates that min/max prove match
+    every row or none, and to estimate the selectivity of the others.
+    """
+
+    def __init__(self, df: pd.DataFrame, pool: _RangeExecutor) -> None:
+        self.row_count = int(df.shape[0])
+        self.nulls: Dict[str, int] = {}
+        self.distinct: Dict[str, int] = {}
+        self.bounds: Dict[str, Tuple[Any, Any]] = {}
+        self.histograms: Dict[str, np.ndarray] = {}
+        numeric = set(df.select_dtypes(include="number").columns)
+        grid = np.linspace(0.0, 1.0, _HISTOGRAM_BUCKETS + 1)
+        quartiles = [_HISTOGRAM_BUCKETS // 4 * i for i in range(5)]
+        described: Dict[str, List[float]] = {}
+        for col in df.columns:
+            series = df[col]
+            missing = series.isna().to_numpy()
+            self.nulls[col] = int(missing.sum())
+            self.distinct[col] = min(self._distinct(series, pool), self.row_count - self.nulls[col])
+            if col in numeric or pd.api.types.is_datetime64_any_dtype(series.dtype):
+                lo, hi = series.min(), series.max()
+                self.bounds[col] = tuple(v.item() if isinstance(v, np.generic) else v for v in (lo, hi))
+            if col not in numeric:
+                continue
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)[~missing]
+            n = len(values)
+            self.histograms[col] = np.quantile(values, grid) if n else np.full(len(grid), np.nan)
+            q = self.histograms[col][quartiles]
+            # pandas' own mean/std, so the table equals df.describe() exactly.
+            mean, std = (np.nan if pd.isna(v) else float(v) for v in (series.mean(), series.std()))
+            described[col] = [n, mean, std, q[0], q[1], q[2], q[3], q[4]]
+        self.describe = pd.DataFrame.from_dict(
+            described, orient="index", columns=["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+        ).astype(np.float64)
+
+    @staticmethod
+    def _distinct(series: pd.Series, pool: _RangeExecutor) -> int:
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            return int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=len(series.dtype.categories))))
+        if not (isinstance(series.dtype, np.dtype) and series.dtype.kind in "iufmM"):
+            # Text and extension arrays: an exact count is cheaper than hashing
+            # every value for HyperLogLog (Arrow strings count natively).
+            return int(series.nunique())
+        m = 1 << _HLL_PRECISION
+
+        def registers(lo: int, hi: int) -> np.ndarray:
+            _, register, rank = _hll_hashes(series.iloc[lo:hi], _HLL_PRECISION)
+            out = np.zeros(m, dtype=np.uint8)
+            np.maximum.at(out, register, rank)
+            return out
+
+        merged = functools.reduce(np.maximum, pool.map(registers, pool.ranges(len(series))))
+        inverse = np.exp2(-merged.astype(np.float64)).sum()
+        return int(_hll_estimate(np.array([inverse]), np.array([m - np.count_nonzero(merged)]), _HLL_PRECISION)[0])
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per column: distinct_estimate, and min/max where known, as JSON values."""
+        out: Dict[str, Dict[str, Any]] = {c: {"distinct_estimate": d} for c, d in self.distinct.items()}
+        for col, (lo, hi) in self.bounds.items():
+            out[col]["min"], out[col]["max"] = _column_values(pd.Series([lo, hi]))
+        return out
+
+    def decide(self, col: str, op: str, val: Any) -> Optional[bool]:
+        """
+        True when `col op val` holds on every row, False when on none, None when
+        min/max cannot tell (or the column/value are not numeric).
+        """
+        if col not in self.histograms or op not in ("==", ">", ">=", "<", "<=", "in"):
+            return None
+        values = val if op == "in" else [val]
+        if not all(_is_number(v) for v in values):
+            return None
+        lo, hi = self.bounds[col]
+        if pd.isna(lo):
+            return False  # all missing: comparisons never match
+        if op in ("==", "in"):
+            if all(v < lo or v > hi for v in values):
+                return False
+            everywhere = lo == hi and any(v == lo for v in values)
+        else:
+            if {">": hi <= val, ">=": hi < val, "<": lo >= val, "<=": lo > val}[op]:
+                return False
+            everywhere = {">": lo > val, ">=": lo >= val, "<": hi < val, "<=": hi <= val}[op]
+        return True if everywhere and self.nulls[col] == 0 else None
+
+    def selectivity(self, col: str, op: str, val: Any) -> Optional[float]:
+        """Fraction of rows matching a range predicate, read off the histogram."""
+        if col not in self.histograms or op not in (">", ">=", "<", "<=") or not _is_number(val):
+            return None
+        grid = self.histograms[col]
+        if np.isnan(grid[0]):
+            return 0.0
+        below = float(np.interp(val, grid, np.linspace(0.0, 1.0, len(grid))))
+        present = 1.0 - self.nulls[col] / max(self.row_count, 1)
+        return present * (below if op in ("<", "<=") else 1.0 - below)
+
+
+class _ColumnCache:
+    """
+    Per-DataFrame derivatives of columns:
+    - normalized copies of text columns (string dtype, optionally lowercased)
+      for contains/startswith/endswith, built lazily on first use so repeated
+      text searches skip the conversion;
+    - indexes built on request with create_index ("trigram", "hash", "sorted");
+    - _GroupPartitions of the group_columns used by groupby_aggregate, so a
+      different aggregation list on the same grouping reuses the group ids;
+    - factorized codes and distinct values of columns counted with nunique or
+      value_counts;
+    - the _ColumnStatistics built when the frame is loaded.
+
+    Nothing outlives its DataFrame: a reload swaps in a new frame, and the old
+    frame's entries are dropped when it is garbage collected. The entries
+    derived implicitly by queries (text columns, codes, partitions) also share
+    a budget of max_derived_bytes across all frames, least recently used
+    first out; an entry larger than the whole budget is returned but not
+    kept. Indexes and statistics stay until their frame goes.
+    """
+
+    def __init__(self, max_derived_bytes: int) -> None:
+        self.max_derived_bytes = max_derived_bytes
+        self._columns: Dict[int, Dict[Tuple[str, Any], Any]] = {}
+        # (id(df), key) -> size of each derived entry, least recently used first.
+        self._derived: "OrderedDict[Tuple[int, Tuple[str, Any]], int]" = OrderedDict()
+        self._derived_bytes = 0
+        self._dead: List[int] = []
+        self._lock = threading.Lock()
+
+    def get(self, df: pd.DataFrame, col: str, lower: bool, timings: Dict[str, Any]) -> pd.Series:
+        key = (col, lower)
+        cached = self._cached(df, key)
+        if cached is not None:
+            timings["text_cache_hits"] = timings.get("text_cache_hits", 0) + 1
+            return cached
+
+        t0 = time.perf_counter()
+        series = _normalized_text(df[col], lower)
+        timings["text_normalize_seconds"] = timings.get("text_normalize_seconds", 0.0) + time.perf_counter() - t0
+        return self._store(df, key, series, int(series.memory_usage(index=False, deep=True)))
+
+    def indexes(self, df: pd.DataFrame, col: Optional[str] = None) -> List[Tuple[str, _ColumnIndex]]:
+        """(column, index) pairs of df, optionally for one column only."""
+        with self._lock:
+            entries = list(self._columns.get(id(df), {}).items())
+        return [(c, v) for (c, kind), v in entries if kind in _INDEX_TYPES and (col is None or c == col)]
+
+    def indexed(self, df: pd.DataFrame) -> Tuple[Tuple[str, str], ...]:
+        """Sorted (column, kind) pairs of df's indexes."""
+        return tuple(sorted((c, index.kind) for c, index in self.indexes(df)))
+
+    def build_index(self, df: pd.DataFrame, col: str, kind: str) -> _ColumnIndex:
+        existing = self._cached(df, (col, kind))
+        return existing or self._store(df, (col, kind), _INDEX_TYPES[kind](df[col]))
+
+    def factorized(self, df: pd.DataFrame, col: str) -> Tuple[np.ndarray, pd.Index]:
+        """
+        pd.factorize(df[col]): (codes, -1 for missing values; distinct values).
+        Codes are int32 below 2**31 - 1 distinct values, like _TrigramIndex's.
+        """
+        existing = self._cached(df, (col, "codes"))
+        if existing is not None:
+            return existing
+        codes, uniques = _factorize(df[col], RANGES)
+        if len(uniques) < 2**31 - 1:
+            codes = codes.astype(np.int32)
+        nbytes = int(codes.nbytes + uniques.memory_usage(deep=True))
+        return self._store(df, (col, "codes"), (codes, uniques), nbytes)
+
+    def codes(self, df: pd.DataFrame, col: str) -> np.ndarray:
+        return self.factorized(df, col)[0]
+
+    def statistics(self, df: pd.DataFrame, build: bool = True) -> Optional[_ColumnStatistics]:
+        """df's _ColumnStatistics, built on first use (None with build=False)."""
+        existing = self._cached(df, ("", "statistics"))
+        if existing is not None or not build:
+            return existing
+        return self._store(df, ("", "statistics"), _ColumnStatistics(df, RANGES))
+
+    def partition(self, df: pd.DataFrame, group_columns: List[str]) -> _GroupPartition:
+        key = (tuple(group_columns), "groupby")
+        existing = self._cached(df, key)
+        if existing is not None:
+            return existing
+        partition = _GroupPartition(df, group_columns, RANGES)
+        return self._store(df, key, partition, partition.nbytes)
+
+    def describe(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        return [
+            {"column": c, "kind": index.kind, "distinct_values": index.distinct_values, "memory_bytes": index.nbytes}
+            for c, index in sorted(self.indexes(df), key=lambda e: (e[0], e[1].kind))
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._purge()
+            entries = [v for cols in self._columns.values() for v in cols.values()]
+            derived_bytes = self._derived_bytes
+        columns = [v for v in entries if isinstance(v, pd.Series)]
+        indexes = [v for v in entries if isinstance(v, tuple(_INDEX_TYPES.values()))]
+        partitions = [v for v in entries if isinstance(v, _GroupPartition)]
+        codes = [v for v in entries if isinstance(v, tuple)]
+        statistics = [v for v in entries if isinstance(v, _ColumnStatistics)]
+        return {
+            "text_columns": len(columns),
+            "text_column_bytes": int(sum(s.memory_usage(index=False, deep=True) for s in columns)),
+            "indexes": len(indexes),
+            "index_bytes": int(sum(i.nbytes for i in indexes)),
+            "group_partitions": len(partitions),
+            "group_partition_bytes": int(sum(p.nbytes for p in partitions)),
+            "value_codes": len(codes),
+            "value_code_bytes": int(sum(c.nbytes + u.memory_usage(deep=True) for c, u in codes)),
+            "column_statistics": len(statistics),
+            "derived_bytes": derived_bytes,
+            "max_derived_bytes": self.max_derived_bytes,
+        }
+
+    def _cached(self, df: pd.DataFrame, key: Tuple[str, Any]) -> Any:
+        with self._lock:
+            value = self._columns.get(id(df), {}).get(key)
+            if value is not None and (id(df), key) in self._derived:
+                self._derived.move_to_end((id(df), key))
+            return value
+
+    def _store(self, df: pd.DataFrame, key: Tuple[str, Any], value: Any, nbytes: Optional[int] = None) -> Any:
+        """
+        Keep value for df under key, or return the entry another thread stored
+        first. nbytes marks a derived entry counted toward max_derived_bytes.
+        """
+        with self._lock:
+            # Before registering entries: a dead frame's id may be reused by df.
+            self._purge()
+            columns = self._columns.get(id(df))
+            if columns is None:
+                columns = self._columns[id(df)] = {}
+                # The caller holds df, so it cannot be collected (and its id
+                # reused) before this finalizer is registered.
+                weakref.finalize(df, self._forget, id(df))
+            existing = columns.get(key)
+            if existing is not None:
+                return existing
+            if nbytes is not None:
+                if nbytes > self.max_derived_bytes:
+                    return value
+                self._derived[(id(df), key)] = nbytes
+                self._derived_bytes += nbytes
+                while self._derived_bytes > self.max_derived_bytes:
+                    (frame, old), size = self._derived.popitem(last=False)
+                    self._columns.get(frame, {}).pop(old, None)
+                    self._derived_bytes -= size
+            columns[key] = value
+            return value
+
+    def _forget(self, frame: int) -> None:
+        # Runs from garbage collection, possibly while this thread holds _lock:
+        # only atomic operations here; _purge settles the byte count later.
+        self._columns.pop(frame, None)
+        self._dead.append(frame)
+
+    def _purge(self) -> None:
+        """Drop the derived-entry sizes of collected frames (caller holds _lock)."""
+        while self._dead:
+            frame = self._dead.pop()
+            for entry in [e for e in self._derived if e[0] == frame]:
+                self._derived_bytes -= self._derived.pop(entry)
+
+
+COLUMN_CACHE = _ColumnCache(max_derived_bytes=int(_env_float("CSV_MCP_DERIVED_CACHE_MB", 1024.0) * 1024 * 1024))
+
+
+class _FilterPlanCache:
+    """
+    Compiled _FilterPlans of in-memory DataFrames, keyed by the DataFrame and
+    the normalized filter spec, so repeated identical requests skip compiling.
+    """
+
+    def __init__(self, max_plans: int) -> None:
+        self.max_plans = max_plans
+        self._plans: "OrderedDict[Tuple[Any, ...], Tuple[weakref.ref, _FilterPlan]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, df: pd.DataFrame, filters: List[Dict[str, Any]], logic: str) -> _FilterPlan:
+        # Building an index changes predicate costs, hence plan order.
+        indexed = COLUMN_CACHE.indexed(df)
+        key = (id(df), json.dumps(filters, sort_keys=True, default=str), logic, indexed)
+        with self._lock:
+            entry = self._plans.get(key)
+            # The weak reference guards against a new DataFrame reusing the id.
+            if entry is not None and entry[0]() is df:
+                self._plans.move_to_end(key)
+                return entry[1]
+        plan = _FilterPlan(df, filters, logic, indexed, COLUMN_CACHE.statistics(df, build=False))
+        with self._lock:
+            self._plans[key] = (weakref.ref(df), plan)
+            while len(self._plans) > max(self.max_plans, 1):
+                self._plans.popitem(last=False)
+        return plan
+
+
+FILTER_PLANS = _FilterPlanCache(max_plans=256)
+
+
+def _filter_mask(
+    df: pd.DataFrame, filters: List[Dict[str, Any]], logic: str, timings: Optional[Dict[str, Any]] = None
+) -> Optional[np.ndarray]:
+    """
+    Combine structured filters into one boolean mask over an in-memory df
+    (None: no filters), reusing its compiled plan and normalized text columns.
+    Raises ValueError with a user-facing message for invalid filters.
+    """
+    return FILTER_PLANS.get(df, filters, logic).mask(df, COLUMN_CACHE, timings)
+
+
+_AGGREGATIONS = ["sum", "mean", "min", "max", "count", "nunique", "approx_nunique"]
+
+
+def _agg_map(
+    columns: List[str], group_columns: List[str], aggregations: List[Dict[str, Any]]
+) -> Dict[str, List[str]]:
+    """Validate a groupby spec and return {column: [agg, ...]} for DataFrame.agg."""
+    missing = [c for c in group_columns if c not in columns]
+    if missing:
+        raise ValueError(f"Unknown group columns: {missing}")
+
+    agg_map: Dict[str, List[str]] = {}
+    for a in aggregations:
+        col = a.get("column")
+        fn = a.get("agg")
+        if not col or col not in columns:
+            raise ValueError(f"Unknown agg column: {col}")
+        if fn not in _AGGREGATIONS:
+            raise ValueError(f"Unsupported agg: {fn}")
+        if fn not in agg_map.setdefault(col, []):
+            agg_map[col].append(fn)
+    return agg_map
+
+
+class _GroupbyCache:
+    """
+    LRU cache of groupby_aggregate results shared by all sessions.
+
+    Keys identify the data and the normalized request: the query source (a
+    DataFrame is immutable once loaded; a streamed CSV also records the file's
+    mtime/size), the backend, the group columns, the (column, agg) pairs
+    regardless of order, and the prior filter. Entries are bounded by their
+    in-memory size (max_bytes); a result larger than the whole budget is
+    returned but not cached.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[weakref.ref, pd.DataFrame, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(
+        self,
+        source: _QuerySource,
+        group_columns: List[str],
+        agg_map: Dict[str, List[str]],
+        filters: Optional[List[Dict[str, Any]]],
+        logic: str,
+        compute: Callable[[], pd.DataFrame],
+    ) -> Tuple[pd.DataFrame, bool]:
+        """Return (grouped, cache_hit); compute() runs on a miss."""
+        key = self._key(source, group_columns, agg_map, filters, logic)
+        with self._lock:
+            entry = self._entries.get(key)
+            # The weak reference guards against a new source reusing the id.
+            if entry is not None and entry[0]() is source:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                cached = entry[1]
+            else:
+                cached = None
+                self.misses += 1
+        if cached is not None:
+            columns = list(group_columns) + [f"{col}_{fn}" for col, fns in agg_map.items() for fn in fns]
+            return (cached if list(cached.columns) == columns else cached[columns]), True
+
+        grouped = compute()
+        nbytes = int(grouped.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            if nbytes <= self.max_bytes:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._bytes -= old[2]
+                self._entries[key] = (weakref.ref(source), grouped, nbytes)
+                self._bytes += nbytes
+                while self._bytes > self.max_bytes:
+                    _, (_, _, evicted) = self._entries.popitem(last=False)
+                    self._bytes -= evicted
+        return grouped, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    @staticmethod
+    def _key(
+        source: _QuerySource,
+        group_columns: List[str],
+        agg_map: Dict[str, List[str]],
+        filters: Optional[List[Dict[str, Any]]],
+        logic: str,
+    ) -> Tuple[Any, ...]:
+        version: Tuple[Any, ...] = ()
+        if isinstance(source, _CsvStream):
+            st = source.csv_path.stat()
+            version = (st.st_mtime_ns, st.st_size)
+        aggs = tuple(sorted((col, fn) for col, fns in agg_map.items() for fn in fns))
+        prior = (json.dumps(filters, sort_keys=True, default=str), logic) if filters else None
+        return (id(source), version, QUERY_BACKEND.name, tuple(group_columns), aggs, prior)
+
+
+GROUPBY_CACHE = _GroupbyCache(max_bytes=int(_env_float("CSV_MCP_RESULT_CACHE_MB", 64.0) * 1024 * 1024))
+
+
+_QuerySource = Union[pd.DataFrame, _CsvStream]
+
+
+def _query_source(session: _Session) -> _QuerySource:
+    """
+    The session's loaded DataFrame, or its _CsvStream when loaded with
+    chunk_rows. Both are immutable, so queries run without holding the lock.
+    """
+    with session.lock.read():
+        if session.df is None and session.stream is not None:
+            return session.stream
+        return _ensure_loaded(session)
+
+
+def _source_columns(source: _QuerySource) -> List[str]:
+    if isinstance(source, _CsvStream):
+        return source.profile.snapshot()["columns"]
+    return list(source.columns)
+
+
+def _top_counts(
+    codes: np.ndarray, uniques: pd.Index, normalize: bool, dropna: bool, limit: int, missing_last: bool = False
+) -> pd.Series:
+    """
+    series.value_counts(normalize=normalize, dropna=dropna).head(limit) from the
+    series' factorized codes: one bincount, then only the top `limit` values are
+    ordered (by count, ties in order of first appearance, like value_counts).
+    """
+    missing = codes < 0
+    counts = np.bincount(codes[~missing], minlength=len(uniques))
+    if not dropna and missing.any():
+        # Missing values rank as one more value, at their first appearance
+        # (after all values for masked arrays, as value_counts does).
+        first = int(np.argmax(missing))
+        at = len(uniques) if missing_last else int(codes[:first].max()) + 1 if first else 0
+        uniques = uniques.insert(at, np.nan)
+        counts = np.insert(counts, at, int(missing.sum()))
+
+    limit = max(limit, 0)
+    if limit < len(counts):
+        kth = np.partition(counts, len(counts) - limit)[len(counts) - limit] if limit else counts.max() + 1
+        above = np.flatnonzero(counts > kth)
+        top = np.concatenate([above, np.flatnonzero(counts == kth)[: limit - len(above)]])
+    else:
+        top = np.arange(len(counts))
+    top = top[np.lexsort((top, -counts[top]))]
+    metric = counts[top] / counts.sum() if normalize else counts[top]
+    return pd.Series(metric, index=uniques[top], name="proportion" if normalize else "count")
+
+
+class _HeavyHitters:
+    """
+    Misra-Gries summary of a column's most frequent values, merged from exact
+    per-chunk counts: whenever more than `counters` values are tracked, the
+    (counters + 1)-th largest count is subtracted from all of them and values
+    reaching zero are dropped.
+
+    Memory stays at `counters` values however many distinct values the column
+    has. Every kept count is at most max_error below the value's true count, and
+    every value whose true count exceeds max_error is kept. max_error is at most
+    rows / (counters + 1), and 0 while nothing has been dropped.
+    """
+
+    def __init__(self, counters: int) -> None:
+        self.counters = max(1, counters)
+        self.counts = pd.Series(dtype="int64")
+        self.max_error = 0
+        self.rows = 0
+
+    def add(self, counts: pd.Series, max_error: int = 0, rows: Optional[int] = None) -> "_HeavyHitters":
+        """Merge exact counts of a chunk, or another summary's counts and error."""
+        self.rows += int(counts.sum()) if rows is None else rows
+        self.max_error += max_error
+        merged = counts if self.counts.empty else self.counts.add(counts, fill_value=0).astype("int64")
+        if len(merged) > self.counters:
+            cut = int(np.partition(merged.to_numpy(), len(merged) - self.counters - 1)[len(merged) - self.counters - 1])
+            merged = merged[merged > cut] - cut
+            self.max_error += cut
+        self.counts = merged
+        return self
+
+    def merge(self, other: "_HeavyHitters") -> "_HeavyHitters":
+        return self.add(other.counts, other.max_error, other.rows)
+
+    def top(self, normalize: bool, limit: int) -> pd.Series:
+        counts = self.counts.sort_values(ascending=False, kind="stable").head(max(limit, 0))
+        if normalize:
+            counts = counts / max(self.rows, 1)
+        counts.attrs["approximate"] = {
+            "method": "misra-gries",
+            "counters": self.counters,
+            "rows_counted": self.rows,
+            "max_count_error": self.max_error,
+        }
+        return counts
+
+
+_HEAVY_HITTER_COUNTERS = _env_int("CSV_MCP_HEAVY_HITTER_COUNTERS", 1024)
+
+
+class _PandasBackend:
+    """
+    Runs query tools with pandas: boolean masks and DataFrame.groupby in memory,
+    or chunk-by-chunk scans for streamed CSVs.
+
+    Every backend returns:
+    - filter_rows: (row_count, first rows up to limit, result for export); extra
+      per-stage timings may be added to the optional timings dict
+    - value_counts: Series of counts/proportions indexed by value, at most limit long
+    - joint_counts: Series of counts indexed by the distinct combinations of
+      several columns (a MultiIndex, sorted with missing values last)
+    - groupby_aggregate: DataFrame of group columns + "<column>_<agg>" columns
+    """
+
+    name = "pandas"
+
+    def filter_rows(
+        self,
+        source: _QuerySource,
+        filters: List[Dict[str, Any]],
+        logic: str,
+        limit: int,
+        timings: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[int, pd.DataFrame, Union[pd.DataFrame, _LazyResult, _SpilledResult]]:
+        if not isinstance(source, _CsvStream):
+            out = _LazyResult(source, _filter_mask(source, filters, logic, timings))
+            return out.row_count, out.head(limit), out
+
+        result = _SpilledResult()
+        head: List[pd.DataFrame] = []
+        kept = 0
+        plan: Optional[_FilterPlan] = None
+        with source.reader() as reader:
+            for i, chunk in enumerate(reader):
+                # Compiled on the first chunk and reused for the rest of the file.
+                plan = plan or _FilterPlan(chunk, filters, logic)
+                mask = plan.mask(chunk)
+                out = chunk if mask is None else chunk[mask]
+                result.append(out, header=i == 0)
+                if kept < limit and not out.empty:
+                    head.append(out.head(limit - kept))
+                    kept += len(head[-1])
+        return result.row_count, pd.concat(head) if head else pd.DataFrame(), result
+
+    def value_counts(
+        self,
+        source: _QuerySource,
+        column: str,
+        normalize: bool,
+        dropna: bool,
+        limit: int,
+        approximate: bool = False,
+    ) -> pd.Series:
+        counters = max(_HEAVY_HITTER_COUNTERS, 4 * limit)
+        if not isinstance(source, _CsvStream):
+            series = source[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Counted from the codes already; exact is as cheap as it gets.
+                return series.value_counts(dropna=dropna, normalize=normalize).head(limit)
+            if approximate:
+
+                def summarize(lo: int, hi: int) -> _HeavyHitters:
+                    return _HeavyHitters(counters).add(series.iloc[lo:hi].value_counts(dropna=dropna, sort=False))
+
+                summaries = RANGES.map(summarize, RANGES.ranges(len(series)))
+                return functools.reduce(_HeavyHitters.merge, summaries).top(normalize, limit)
+            masked = isinstance(series.array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray))
+            return _top_counts(*COLUMN_CACHE.factorized(source, column), normalize, dropna, limit, masked)
+
+        if approximate:
+            hitters = _HeavyHitters(counters)
+            with source.reader() as reader:
+                for chunk in reader:
+                    hitters.add(chunk[column].value_counts(dropna=dropna, sort=False))
+            return hitters.top(normalize, limit)
+
+        counts: Optional[pd.Series] = None
+        with source.reader() as reader:
+            for chunk in reader:
+                vc = chunk[column].value_counts(dropna=dropna, sort=False)
+                if counts is None:
+                    counts = vc
+                    continue
+                # add() sorts the union of the indexes; reindex to keep values in
+                # order of first appearance, so ties rank as in memory.
+                seen = counts.index.append(vc.index[~vc.index.isin(counts.index)])
+                counts = counts.add(vc, fill_value=0).reindex(seen)
+        if counts is None:
+            return pd.Series(dtype="int64")
+        counts = counts.astype("int64").sort_values(ascending=False, kind="stable")
+        if normalize:
+            counts = counts / counts.sum()
+        return counts.head(limit)
+
+    def joint_counts(self, source: _QuerySource, columns: List[str], dropna: bool) -> pd.Series:
+        if not isinstance(source, _CsvStream):
+            # The cached partition of groupby_aggregate on the same columns:
+            # its group sizes are the joint counts.
+            partition = COLUMN_CACHE.partition(source, columns)
+            counts = pd.Series(partition.counts, index=pd.MultiIndex.from_frame(partition.keys), name="count")
+        else:
+            totals = _SpillingReducer(columns, {"__count": "sum"}, _env_int("CSV_MCP_SPILL_ROWS", 1_000_000))
+            with source.reader() as reader:
+                for chunk in reader:
+                    sizes = chunk.groupby(columns, dropna=False, sort=False, observed=True).size()
+                    totals.add(sizes.rename("__count").reset_index())
+            frame = totals.result()
+            counts = pd.Series(
+                frame["__count"].to_numpy(dtype=np.int64), index=pd.MultiIndex.from_frame(frame[columns]), name="count"
+            ).sort_index(na_position="last")
+        if dropna:
+            counts = counts[~counts.index.to_frame(index=False).isna().any(axis=1).to_numpy()]
+        return counts
+
+    def groupby_aggregate(
+        self,
+        source: _QuerySource,
+        group_columns: List[str],
+        agg_map: Dict[str, List[str]],
+        filters: Optional[List[Dict[str, Any]]] = None,
+        logic: str = "and",
+    ) -> pd.DataFrame:
+        if isinstance(source, _CsvStream):
+            return _groupby_streaming(source, group_columns, agg_map, filters, logic)
+        rows = _filter_mask(source, filters, logic) if filters else None
+        partition = COLUMN_CACHE.partition(source, group_columns)
+        return partition.aggregate(source, agg_map, rows, COLUMN_CACHE, RANGES)
+
+
+def _sql_ident(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+_SQL_AGGREGATES = {
+    "sum": "sum({})",
+    "mean": "avg({})",
+    "min": "min({})",
+    "max": "max({})",
+    "count": "count({})",
+    "nunique": "count(DISTINCT {})",
+}
+
+_SQL_COMPARISONS = {"==": "=", "!=": "IS DISTINCT FROM", ">": ">", ">=": ">=", "<": "<", "<=": "<="}
+
+
+class _DuckDBBackend:
+    """
+    Compiles the structured specs into one SQL query run by an embedded DuckDB.
+
+    A loaded DataFrame is registered with DuckDB and scanned in place. A streamed
+    CSV is read by DuckDB directly, so out-of-core queries use its parallel
+    CSV reader and spilling instead of pandas chunks. Predicates are wrapped in
+    coalesce(..., false) so missing values behave like pandas masks.
+    """
+
+    name = "duckdb"
+
+    def filter_rows(
+        self,
+        source: _QuerySource,
+        filters: List[Dict[str, Any]],
+        logic: str,
+        limit: int,
+        timings: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[int, pd.DataFrame, Union[pd.DataFrame, _LazyResult, _SpilledResult]]:
+        where, params = self._where(_source_columns(source), filters, logic)
+        sql = f"SELECT * FROM t WHERE {where}"
+        with self._connect(source) as con:
+            if not isinstance(source, _CsvStream):
+                out = con.execute(sql, params).df()
+                return int(out.shape[0]), out.head(limit), out
+
+            result = _SpilledResult()
+            con.execute(f"CREATE TEMP TABLE matches AS {sql}", params)
+            con.execute(f"COPY matches TO {self._literal(str(result.path))} (HEADER, DELIMITER ',')")
+            result.row_count = int(con.execute("SELECT count(*) FROM matches").fetchone()[0])
+            head = con.execute("SELECT * FROM matches LIMIT ?", [max(limit, 0)]).df()
+            return result.row_count, head, result
+
+    def value_counts(
+        self,
+        source: _QuerySource,
+        column: str,
+        normalize: bool,
+        dropna: bool,
+        limit: int,
+        approximate: bool = False,
+    ) -> pd.Series:
+        # Exact either way: DuckDB's hash aggregate is parallel and spills.
+        col = _sql_ident(column)
+        where = f"WHERE {col} IS NOT NULL" if dropna else ""
+        metric = f"count(*) / (SELECT count(*) FROM t {where})" if normalize else "count(*)"
+        sql = (
+            f"SELECT {col} AS value, {metric} AS metric FROM t {where} "
+            f"GROUP BY {col} ORDER BY count(*) DESC LIMIT ?"
+        )
+        with self._connect(source) as con:
+            out = con.execute(sql, [max(limit, 0)]).df()
+        return pd.Series(out["metric"].to_numpy(), index=out["value"], name=column)
+
+    def joint_counts(self, source: _QuerySource, columns: List[str], dropna: bool) -> pd.Series:
+        keys = ", ".join(_sql_ident(c) for c in columns)
+        where = " AND ".join(f"{_sql_ident(c)} IS NOT NULL" for c in columns) if dropna else "true"
+        order = ", ".join(f"{_sql_ident(c)} NULLS LAST" for c in columns)
+        sql = f"SELECT {keys}, count(*) AS __count FROM t WHERE {where} GROUP BY {keys} ORDER BY {order}"
+        with self._connect(source) as con:
+            out = con.execute(sql).df()
+        return pd.Series(
+            out["__count"].to_numpy(dtype=np.int64), index=pd.MultiIndex.from_frame(out[columns]), name="count"
+        )
+
+    def groupby_aggregate(
+        self,
+        source: _QuerySource,
+        group_columns: List[str],
+        agg_map: Dict[str, List[str]],
+        filters: Optional[List[Dict[str, Any]]] = None,
+        logic: str = "and",
+    ) -> pd.DataFrame:
+        where, params = self._where(_source_columns(source), filters or [], logic)
+        keys = ", ".join(_sql_ident(c) for c in group_columns)
+        aggs = "".join(
+            f", {_SQL_AGGREGATES[fn].format(_sql_ident(col))} AS {_sql_ident(f'{col}_{fn}')}"
+            for col, fns in agg_map.items()
+            for fn in fns
+            if fn != "approx_nunique"
+        )
+        order = ", ".join(f"{_sql_ident(c)} NULLS LAST" for c in group_columns)
+        sql = f"SELECT {keys}{aggs} FROM t WHERE {where} GROUP BY {keys} ORDER BY {order}"
+        approximate: Dict[str, Any] = {}
+        with self._connect(source) as con:
+            grouped = con.execute(sql, params).df()
+            for col, fns in agg_map.items():
+                if "approx_nunique" not in fns:
+                    continue
+                # Same HyperLogLog estimator as the pandas backend, with DuckDB's hash.
+                sketch = con.execute(self._hll_registers(keys, col, where), params).df()
+                registers = grouped[group_columns].merge(sketch, on=group_columns, how="left")
+                zeros = (1 << _HLL_PRECISION) - registers["filled"].fillna(0).to_numpy()
+                inverse = registers["inverse"].fillna(0.0).to_numpy() + zeros
+                grouped[f"{col}_approx_nunique"] = _hll_estimate(inverse, zeros, _HLL_PRECISION)
+                approximate[f"{col}_approx_nunique"] = _hll_bound(_HLL_PRECISION)
+        if approximate:
+            grouped = grouped[group_columns + [f"{col}_{fn}" for col, fns in agg_map.items() for fn in fns]]
+            grouped.attrs["approximate"] = approximate
+        return grouped
+
+    @staticmethod
+    def _hll_registers(keys: str, col: str, where: str) -> str:
+        """Per group: sum of 2**-rank over its filled registers, and their number."""
+        low = (1 << _HLL_RANK_BITS) - 1
+        rank = (
+            f"CASE WHEN h & {low} = 0 THEN {_HLL_RANK_BITS + 1} "
+            f"ELSE {_HLL_RANK_BITS} - floor(log2(CAST(h & {low} AS DOUBLE))) END"
+        )
+        hashed = f"SELECT {keys}, hash({_sql_ident(col)}) AS h FROM t WHERE ({where}) AND {_sql_ident(col)} IS NOT NULL"
+        registers = (
+            f"SELECT {keys}, h >> {64 - _HLL_PRECISION} AS reg, max({rank}) AS r "
+            f"FROM ({hashed}) GROUP BY {keys}, reg"
+        )
+        return f"SELECT {keys}, sum(pow(2.0, -r)) AS inverse, count(*) AS filled FROM ({registers}) GROUP BY {keys}"
+
+    def _where(self, columns: List[str], filters: List[Dict[str, Any]], logic: str) -> Tuple[str, List[Any]]:
+        if not filters:
+            return "true", []
+        params: List[Any] = []
+        return self._clause(_FilterNode(logic, [_parse_filter(f, columns) for f in filters]), params), params
+
+    def _clause(self, node: _FilterNode, params: List[Any]) -> str:
+        if node.kind == "not":
+            return f"NOT ({self._clause(node.children[0], params)})"
+        if node.kind != "pred":
+            return "(" + f" {node.kind.upper()} ".join(self._clause(c, params) for c in node.children) + ")"
+
+        col, op, val, case_sensitive, regex = node.step
+        ident = _sql_ident(col)
+        if op in _SQL_COMPARISONS:
+            clause = f"{ident} {_SQL_COMPARISONS[op]} ?"
+            params.append(val)
+        elif op in ["contains", "startswith", "endswith"]:
+            text = f"CAST({ident} AS VARCHAR)"
+            needle = str(val)
+            if not case_sensitive:
+                text = f"lower({text})"
+                needle = needle.lower()
+            fn = {
+                "contains": "regexp_matches" if regex else "contains",
+                "startswith": "starts_with",
+                "endswith": "ends_with",
+            }[op]
+            clause = f"{fn}({text}, ?)"
+            params.append(needle)
+        else:
+            # SQL IN never matches NULL, but isin([..., None]) matches missing values.
+            values = [v for v in val if not pd.isna(v)]
+            clause = f"{ident} IN ({', '.join('?' for _ in values)})" if values else "false"
+            params.extend(values)
+            if len(values) < len(val):
+                clause = f"({clause} OR {ident} IS NULL)"
+        return f"coalesce({clause}, false)"
+
+    @contextmanager
+    def _connect(self, source: _QuerySource) -> Iterator[Any]:
+        con = duckdb.connect()
+        try:
+            if isinstance(source, _CsvStream):
+                options = {"delim": source.read_kwargs.get("sep", ","), "header": True}
+                if source.read_kwargs.get("encoding"):
+                    options["encoding"] = source.read_kwargs["encoding"]
+                rendered = ", ".join(f"{k} = {self._literal(v)}" for k, v in options.items())
+                path = self._literal(str(source.csv_path))
+                con.execute(f"CREATE VIEW t AS SELECT * FROM read_csv({path}, {rendered})")
+            elif pa is not None:
+                # Arrow tables scan much faster than DataFrames with object/str
+                # columns, and the conversion is near zero-copy.
+                con.register("t", pa.Table.from_pandas(source, preserve_index=False))
+            else:
+                con.register("t", source)
+            yield con
+        finally:
+            con.close()
+
+    @staticmethod
+    def _literal(value: Any) -> str:
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        return "'" + str(value).replace("'", "''") + "'"
+
+
+def _make_query_backend(name: str) -> Union[_PandasBackend, _DuckDBBackend]:
+    if name == "pandas":
+        return _PandasBackend()
+    if name == "duckdb":
+        if duckdb is None:
+            raise RuntimeError("CSV_MCP_QUERY_BACKEND=duckdb requires the duckdb package to be installed.")
+        return _DuckDBBackend()
+    raise RuntimeError(f"Unknown CSV_MCP_QUERY_BACKEND: {name!r} (expected 'pandas' or 'duckdb').")
+
+
+QUERY_BACKEND = _make_query_backend(os.getenv("CSV_MCP_QUERY_BACKEND", "pandas").strip().lower())
 
 
 @mcp.tool()
@@ -96,7 +2998,7 @@ def set_base_directory(path: str) -> Dict[str, Any]:
     Example:
       set_base_directory("C:\\Users\\pchitnbh\\Documents\\data")
     """
-    with _lock:
+    with STATE.base_dir_lock.write():
         base = Path(path).expanduser().resolve()
         if not base.exists() or not base.is_dir():
             raise FileNotFoundError(f"Directory not found: {base}")
@@ -109,16 +3011,22 @@ def get_base_directory() -> Dict[str, Any]:
     """
     Returns the current allowed base directory for CSV access.
     """
-    with _lock:
+    with STATE.base_dir_lock.read():
         return {"base_dir": str(STATE.base_dir)}
 
 
 @mcp.tool()
+@_offloaded
 def load_csv(
     path: str,
     delimiter: str = ",",
     encoding: Optional[str] = None,
     sample_rows: int = 10,
+    sidecar: bool = False,
+    engine: str = "c",
+    dtype_backend: Optional[str] = None,
+    chunk_rows: Optional[int] = None,
+    categorize: bool = True,
 ) -> Dict[str, Any]:
     """
     Load a CSV file from your computer.
@@ -126,80 +3034,319 @@ def load_csv(
     Notes:
     - For safety, the file must be under the configured base directory.
     - If you want a different root, call set_base_directory or set CSV_MCP_BASEDIR before starting.
+    - sidecar=True keeps a binary columnar copy (<file>.csv.arrow) next to the CSV
+      after the first parse; later loads memory-map it instead of re-parsing the
+      text, as long as the CSV's size and mtime are unchanged. Requires pyarrow.
+    - engine: "c" (default), "python" or "pyarrow" (multithreaded parser).
+    - dtype_backend: None (NumPy dtypes), "numpy_nullable" or "pyarrow"
+      (Arrow-backed columns; much smaller for text-heavy files).
+    - chunk_rows streams the file in chunks of that many rows instead of loading
+      it: the response arrives after the first chunk with a partial profile, and
+      get_schema reports the profile as the remaining chunks are scanned. Use it
+      for files larger than memory.
+    - categorize (default true) stores low-cardinality text columns (Department,
+      Location, Status, ...) as categoricals; the profile reports which columns
+      were encoded and how much memory that saved.
 
     Returns:
     - Basic profile + a small preview.
     """
-    with _lock:
+    session = _session()
+    with STATE.base_dir_lock.read():
         csv_path = _resolve_csv_path(path)
 
-        read_kwargs: Dict[str, Any] = {"sep": delimiter}
-        if encoding:
-            read_kwargs["encoding"] = encoding
+    if engine not in _CSV_ENGINES:
+        return {"ok": False, "error": f"engine must be one of {sorted(_CSV_ENGINES)}"}
+    if dtype_backend is not None and dtype_backend not in _DTYPE_BACKENDS:
+        return {"ok": False, "error": f"dtype_backend must be one of {sorted(_DTYPE_BACKENDS)} or null"}
+    if pa is None and (engine == "pyarrow" or dtype_backend == "pyarrow"):
+        return {"ok": False, "error": "engine/dtype_backend 'pyarrow' requires pyarrow to be installed."}
+
+    read_kwargs: Dict[str, Any] = {"sep": delimiter, "engine": engine}
+    if encoding:
+        read_kwargs["encoding"] = encoding
+    if dtype_backend:
+        read_kwargs["dtype_backend"] = dtype_backend
+
+    if chunk_rows is not None:
+        if chunk_rows <= 0:
+            return {"ok": False, "error": "chunk_rows must be a positive integer."}
+        if engine == "pyarrow":
+            return {"ok": False, "error": "chunk_rows is not supported with engine='pyarrow'."}
+        return _load_streaming(session, csv_path, read_kwargs, chunk_rows, sample_rows)
+
+    sidecar_status: Optional[str] = None
+    if sidecar and pa is None:
+        sidecar_status = "unavailable: pyarrow is not installed"
+        sidecar = False
+
+    def parse() -> _Dataset:
+        nonlocal sidecar_status
+        df = _read_sidecar(csv_path, read_kwargs) if sidecar else None
+        if df is not None:
+            sidecar_status = "loaded"
+        else:
+            # Stat before parsing: a CSV rewritten meanwhile gets a stale tag
+            # and is parsed again next time, never the other way round.
+            st = csv_path.stat()
+            df = pd.read_csv(csv_path, **read_kwargs)
+            if sidecar:
+                try:
+                    _write_sidecar(csv_path, read_kwargs, df, st)
+                    sidecar_status = "written"
+                except (OSError, pa.ArrowException) as e:
+                    sidecar_status = f"error: {e}"
+        encoded = _dictionary_encode(df, _CATEGORY_MAX_RATIO) if categorize else {}
+        return _Dataset(df, encoded)
+
+    # Parse outside the session lock; only the swap below is exclusive, so
+    # queries against the previous DataFrame keep running meanwhile.
+    cache_key = _frame_cache_key(csv_path, {**read_kwargs, "categorize": categorize})
+    dataset, cache_hit = FRAME_CACHE.get_or_load(cache_key, parse)
+    df = dataset.df
+
+    with session.lock.write():
+        if session.stream is not None:
+            session.stream.cancel()
+        session.csv_path = str(csv_path)
+        session.dataset = dataset
+        session.stream = None
+        session.last_result = None
+
+    evicted = STATE.sessions.enforce_budget(keep=session)
 
-        df = pd.read_csv(csv_path, **read_kwargs)
+    return {
+        "ok": True,
+        "csv_path": str(csv_path),
+        "cache_hit": cache_hit,
+        "sidecar": sidecar_status,
+        "evicted_sessions": len(evicted),
+        "profile": _basic_profile(dataset),
+        "preview": _df_to_rows(df, sample_rows),
+    }
 
-        STATE.csv_path = str(csv_path)
-        STATE.df = df
-        STATE.last_result = None
 
-        return {
+def _load_streaming(
+    session: _Session,
+    csv_path: Path,
+    read_kwargs: Dict[str, Any],
+    chunk_rows: int,
+    sample_rows: int,
+) -> Dict[str, Any]:
+    stream = _CsvStream(csv_path, read_kwargs, chunk_rows)
+    reader = stream.reader()
+    first = next(iter(reader), None)
+    if first is None:
+        first = pd.DataFrame()
+    else:
+        stream.profile.add(first)
+
+    with session.lock.write():
+        if session.stream is not None:
+            session.stream.cancel()
+        session.csv_path = str(csv_path)
+        session.dataset = None
+        session.stream = stream
+        session.last_result = None
+
+    threading.Thread(
+        target=stream.profile_remaining, args=(reader,), name="csv-analyst-profile", daemon=True
+    ).start()
+
+    return {
+        "ok": True,
+        "csv_path": str(csv_path),
+        "streaming": True,
+        "chunk_rows": chunk_rows,
+        "profile": stream.profile.snapshot(),
+        "preview": _df_to_rows(first, sample_rows),
+    }
+
+
+@mcp.tool()
+@_offloaded
+def get_schema(histograms: bool = False) -> Dict[str, Any]:
+    """
+    Return CSV schema details: columns, types, and missing counts.
+
+    The statistics computed at load are included: per column a distinct count
+    ("distinct_estimate": exact for text, a HyperLogLog estimate within a few
+    percent for numbers and dates) and min/max of numeric and date columns.
+    histograms=True adds each numeric column's equi-depth histogram: 65 values
+    splitting its non-missing values into 64 equally sized buckets.
+
+    For a CSV loaded with chunk_rows, the profile grows as the file is scanned;
+    "complete" turns true once the last chunk has been counted.
+    """
+    session = _session()
+    with session.lock.read():
+        if session.df is None and session.stream is not None:
+            return {"ok": True, "csv_path": session.csv_path, "profile": session.stream.profile.snapshot()}
+        df = _ensure_loaded(session)
+        indexes = COLUMN_CACHE.describe(df)
+        out = {
             "ok": True,
-            "csv_path": STATE.csv_path,
-            "profile": _basic_profile(df),
-            "preview": _df_to_rows(df, sample_rows),
+            "csv_path": session.csv_path,
+            "profile": _basic_profile(session.dataset),
+            "indexes": indexes,
+            "index_memory_bytes": int(sum(i["memory_bytes"] for i in indexes)),
         }
+        stats = session.dataset.stats
+        if histograms and stats:
+            out["histograms"] = {c: _column_values(pd.Series(h)) for c, h in stats.histograms.items()}
+        return out
 
 
 @mcp.tool()
-def get_schema() -> Dict[str, Any]:
+@_offloaded
+def create_index(column: str, kind: str = "hash") -> Dict[str, Any]:
     """
-    Return CSV schema details: columns, types, and missing counts.
+    Build an index on a column of the loaded CSV; filter_rows (pandas query
+    backend) then uses it automatically.
+
+    kind:
+      "hash": row positions per distinct value, for ==, != and in.
+      "sorted": row positions ordered by value, for ==, !=, >, >=, <, <= and
+        in on a numeric or datetime column.
+      "trigram": substring index for literal contains/startswith/endswith on
+        a text column. Searches check each distinct value once, narrowed to
+        the values sharing the needle's 3-character substrings.
+
+    Indexes are kept with the loaded DataFrame and dropped when it is replaced;
+    get_schema lists them with their memory use. Not available for CSVs loaded
+    with chunk_rows.
     """
-    with _lock:
-        df = _ensure_loaded()
-        return {"ok": True, "csv_path": STATE.csv_path, "profile": _basic_profile(df)}
+    if kind not in _INDEX_KINDS:
+        return {"ok": False, "error": f"kind must be one of {_INDEX_KINDS}"}
+
+    session = _session()
+    with session.lock.read():
+        df = _ensure_loaded(session)
+    if column not in df.columns:
+        return {"ok": False, "error": f"Unknown column: {column}"}
+
+    t0 = time.perf_counter()
+    try:
+        index = COLUMN_CACHE.build_index(df, column, kind)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    return {
+        "ok": True,
+        "column": column,
+        "kind": kind,
+        "distinct_values": index.distinct_values,
+        "memory_bytes": index.nbytes,
+        "build_seconds": time.perf_counter() - t0,
+    }
 
 
 @mcp.tool()
-def preview(rows: int = 20, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+@_offloaded
+def preview(rows: int = 20, columns: Optional[List[str]] = None, result_format: str = "records") -> Dict[str, Any]:
     """
     Preview rows from the loaded CSV.
 
     Args:
       rows: number of rows to return
       columns: optional list of columns to include
+      result_format: "records" (list of row objects) or "columnar"
+        (column names once plus one value array per column; more compact)
 
     Returns:
       List of row objects.
     """
-    with _lock:
-        df = _ensure_loaded()
-        out = df
+    if result_format not in _RESULT_FORMATS:
+        return {"ok": False, "error": f"result_format must be one of {_RESULT_FORMATS}"}
+
+    session = _session()
+    with session.lock.read():
+        df = _ensure_loaded(session)
         if columns:
             missing = [c for c in columns if c not in df.columns]
             if missing:
                 return {"ok": False, "error": f"Unknown columns: {missing}"}
-            out = df[columns]
 
-        STATE.last_result = out.copy()
-        return {"ok": True, "rows": _df_to_rows(out, rows)}
+    out = _LazyResult(df, columns=columns or None)
+    session.set_last_result(df, out)
+    return {"ok": True, **_rows_payload(out.head(rows), rows, result_format)}
+
+
+_QUANTILE_SAMPLE_ROWS = _env_int("CSV_MCP_QUANTILE_SAMPLE_ROWS", 100_000)
+_QUANTILE_CONFIDENCE = 0.99
+
+
+def _approximate_describe(df: pd.DataFrame, sample_rows: int) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    df.describe(include="number").transpose() with exact count/mean/std/min/max
+    and the percentiles of a uniform sample of sample_rows rows, plus the
+    percentiles' error bound.
+    """
+    numeric = df.select_dtypes(include="number")
+    n = int(numeric.shape[0])
+    positions = np.sort(np.random.default_rng(0).choice(n, size=min(n, sample_rows), replace=False))
+    sample = numeric.iloc[positions]
+    quantiles = sample.quantile([0.25, 0.5, 0.75]).transpose()
+    quantiles.columns = ["25%", "50%", "75%"]
+    desc = pd.concat([numeric.agg(["count", "mean", "std", "min", "max"]).transpose(), quantiles], axis=1)
+    desc = desc[["count", "mean", "std", "min", "25%", "50%", "75%", "max"]].astype(np.float64)
+
+    # Dvoretzky-Kiefer-Wolfowitz: with probability >= confidence, the sample's
+    # empirical CDF is within rank_error of the column's at every value (a sample
+    # drawn without replacement is at least as close).
+    sampled = sample.count().to_numpy()
+    rank_error = np.sqrt(np.log(2 / (1 - _QUANTILE_CONFIDENCE)) / (2 * np.maximum(sampled, 1)))
+    exact = len(positions) == n
+    bound = {
+        "method": "uniform sample",
+        "sample_rows": len(positions),
+        "confidence": _QUANTILE_CONFIDENCE,
+        "rank_error": {c: 0.0 if exact else round(float(e), 4) for c, e in zip(numeric.columns, rank_error)},
+    }
+    return desc, bound
 
 
 @mcp.tool()
-def describe_numeric() -> Dict[str, Any]:
+@_offloaded
+def describe_numeric(approximate: bool = False) -> Dict[str, Any]:
     """
     Return summary stats for numeric columns only.
+
+    The stats are computed once when the CSV is loaded, so they are returned
+    immediately and exactly. With load-time statistics turned off
+    (CSV_MCP_COLUMN_STATS=0) the frame is scanned on every call instead.
+
+    approximate: only when scanning, estimate the 25%/50%/75% percentiles from
+      a uniform random sample of CSV_MCP_QUANTILE_SAMPLE_ROWS rows (default
+      100000) instead of all rows; count, mean, std, min and max stay exact.
+      "approximate" in the response gives each column's rank error: with 99%
+      confidence, every percentile is exact for some rank within that fraction
+      of the requested one (e.g. a 50% estimate with rank_error 0.005 lies
+      between the exact 49.5% and 50.5% percentiles).
     """
-    with _lock:
-        df = _ensure_loaded()
+    session = _session()
+    with session.lock.read():
+        df = _ensure_loaded(session)
+        stats = session.dataset.stats
+    bound = None
+    if stats:
+        desc = stats.describe
+    elif approximate:
+        desc, bound = _approximate_describe(df, _QUANTILE_SAMPLE_ROWS)
+    else:
         desc = df.describe(include="number").transpose()
-        STATE.last_result = desc.reset_index().rename(columns={"index": "column"})
-        return {"ok": True, "summary": STATE.last_result.to_dict(orient="records")}
+    summary = desc.reset_index().rename(columns={"index": "column"})
+    session.set_last_result(df, summary)
+    out = {"ok": True, "summary": _df_to_rows(summary, int(summary.shape[0]))}
+    if bound is not None:
+        out["approximate"] = bound
+    return out
 
 
 @mcp.tool()
-def value_counts(column: str, limit: int = 25, normalize: bool = False, dropna: bool = True) -> Dict[str, Any]:
+@_offloaded
+def value_counts(
+    column: str, limit: int = 25, normalize: bool = False, dropna: bool = True, approximate: bool = False
+) -> Dict[str, Any]:
     """
     Value counts for a single column.
 
@@ -207,28 +3354,183 @@ def value_counts(column: str, limit: int = 25, normalize: bool = False, dropna:
     - "What are the top categories in X?"
     - "How many records per status?"
 
+    approximate: find the top values with a bounded-memory heavy-hitters
+      summary (Misra-Gries, CSV_MCP_HEAVY_HITTER_COUNTERS counters, default
+      1024) instead of counting every distinct value. Reported counts may be
+      up to "approximate".max_count_error below the true counts, and every
+      value occurring more often than that is found. Useful on streamed or
+      very high-cardinality columns.
+
     Returns:
       List of {value, count, proportion?}
     """
-    with _lock:
-        df = _ensure_loaded()
-        if column not in df.columns:
-            return {"ok": False, "error": f"Unknown column: {column}"}
+    session = _session()
+    source = _query_source(session)
+    if column not in _source_columns(source):
+        return {"ok": False, "error": f"Unknown column: {column}"}
+
+    vc = QUERY_BACKEND.value_counts(source, column, normalize, dropna, limit, approximate)
+    values = pd.Series(vc.index, dtype=vc.index.dtype)
+    metrics = vc.to_numpy(dtype=np.float64 if normalize else np.int64)
+    result = [{"value": v, "metric": m} for v, m in zip(_column_values(values), metrics.tolist())]
+
+    session.set_last_result(source, pd.DataFrame({"value": values, "metric": metrics}))
+    out: Dict[str, Any] = {"ok": True, "column": column, "results": result}
+    if vc.attrs.get("approximate"):
+        out["approximate"] = vc.attrs["approximate"]
+    return out
+
 
-        vc = df[column].value_counts(dropna=dropna, normalize=normalize).head(limit)
-        result = []
-        for idx, val in vc.items():
-            result.append({"value": idx if pd.notna(idx) else None, "metric": float(val) if normalize else int(val)})
+_CROSSTAB_MAX_COLUMNS = 1000
+_NORMALIZE_MODES = [False, True, "all", "index", "columns"]
 
-        STATE.last_result = pd.DataFrame(result)
-        return {"ok": True, "column": column, "results": result}
+
+def _joint_proportions(counts: pd.Series, normalize: Union[bool, str]) -> pd.Series:
+    """
+    Joint counts as proportions of all counted rows (True / "all"), of the rows
+    sharing the leading columns' values ("index") or the last column's value
+    ("columns").
+    """
+    if normalize in (True, "all"):
+        return counts / max(int(counts.sum()), 1)
+    last = counts.index.nlevels - 1
+    levels = list(range(last)) if normalize == "index" else [last]
+    return counts / counts.groupby(level=levels, dropna=False, sort=False).transform("sum")
+
+
+def _crosstab(counts: pd.Series, normalize: Union[bool, str], margins: bool) -> pd.DataFrame:
+    """
+    Joint counts as pd.crosstab lays them out: the leading columns, then one
+    column per value of the last column, optionally with "All" totals.
+    Normalized tables keep the margins pd.crosstab keeps: both for "all", the
+    "All" row for "index" and the "All" column for "columns".
+    """
+    leading = list(counts.index.names[:-1])
+    distinct = counts.index.get_level_values(-1).nunique(dropna=False)
+    if distinct > _CROSSTAB_MAX_COLUMNS:
+        raise ValueError(
+            f"crosstab needs at most {_CROSSTAB_MAX_COLUMNS} distinct values in {counts.index.names[-1]!r}, "
+            f"found {distinct}; put it first or use value_counts_multi without crosstab."
+        )
+    table = counts.unstack(level=-1, fill_value=0)
+    missing = table.columns.isna()
+    table = table[table.columns[~missing].append(table.columns[missing])]
+    table.columns = ["null" if v is None else str(v) for v in _column_values(pd.Series(table.columns))]
+    row_totals, col_totals, total = table.sum(axis=1), table.sum(axis=0), max(int(counts.sum()), 1)
+    if normalize in (True, "all"):
+        table, row_totals, col_totals = table / total, row_totals / total, col_totals / total
+    elif normalize == "index":
+        table, row_totals, col_totals = table.div(row_totals, axis=0), None, col_totals / total
+    elif normalize == "columns":
+        table, row_totals, col_totals = table.div(col_totals, axis=1), row_totals / total, None
+    if margins and row_totals is not None:
+        table["All"] = row_totals
+    table = table.reset_index()
+    if margins and col_totals is not None:
+        all_row = {c: "All" if i == 0 else "" for i, c in enumerate(leading)}
+        all_row.update(col_totals.to_dict())
+        if row_totals is not None:
+            all_row["All"] = row_totals.sum()
+        table = pd.concat([table, pd.DataFrame([all_row])], ignore_index=True)
+    return table
 
 
 @mcp.tool()
+@_offloaded
+def value_counts_multi(
+    columns: List[str],
+    limit: int = 25,
+    normalize: Union[bool, str] = False,
+    dropna: bool = True,
+    crosstab: bool = False,
+    margins: bool = False,
+    result_format: str = "records",
+) -> Dict[str, Any]:
+    """
+    Joint value counts of several columns, counted in one pass.
+
+    Great for:
+    - "How many records per Department and Status?"
+    - "Cross-tabulate Location by Status"
+
+    normalize: False for counts; True or "all" for proportions of all counted
+      rows; "index" for proportions within each combination of the leading
+      columns; "columns" for proportions within each value of the last column.
+    dropna: skip rows where any of the columns is missing
+    crosstab: return a table like pd.crosstab instead: one row per combination
+      of the leading columns, one column per value of the last column (at
+      most 1000 distinct values).
+    margins: with crosstab, add "All" row and column totals; otherwise return
+      each column's own top `limit` values under "margins", summed from the
+      joint counts.
+    result_format: "records" or "columnar" (see filter_rows)
+
+    In memory, the combinations come from the group partition groupby_aggregate
+    caches for the same columns, so repeated calls (and groupby_aggregate on
+    those columns) do not group the rows again. For a CSV loaded with
+    chunk_rows, counts are merged chunk by chunk.
+
+    Returns:
+      One row per combination, most frequent first, with "count" or
+      "proportion" (or the crosstab rows). Rows beyond the first `limit` are
+      paged with fetch_page via "cursor"; row_count counts all of them.
+    """
+    if result_format not in _RESULT_FORMATS:
+        return {"ok": False, "error": f"result_format must be one of {_RESULT_FORMATS}"}
+    if normalize not in _NORMALIZE_MODES:
+        return {"ok": False, "error": f"normalize must be one of {_NORMALIZE_MODES}"}
+    if not columns or len(set(columns)) != len(columns):
+        return {"ok": False, "error": "columns must be a non-empty list of distinct columns"}
+    if (crosstab or normalize in ("index", "columns")) and len(columns) < 2:
+        return {"ok": False, "error": "crosstab and normalize='index'/'columns' need at least two columns"}
+
+    session = _session()
+    source = _query_source(session)
+    missing = [c for c in columns if c not in _source_columns(source)]
+    if missing:
+        return {"ok": False, "error": f"Unknown columns: {missing}"}
+
+    out: Dict[str, Any] = {"ok": True}
+    try:
+        counts = QUERY_BACKEND.joint_counts(source, columns, dropna)
+        if crosstab:
+            result = _crosstab(counts, normalize, margins)
+        else:
+            metric = _joint_proportions(counts, normalize) if normalize else counts
+            order = np.argsort(-counts.to_numpy(), kind="stable")
+            result = metric.iloc[order].rename("proportion" if normalize else "count").reset_index()
+            if margins:
+                total = max(int(counts.sum()), 1)
+                out["margins"] = {}
+                for level, col in enumerate(columns):
+                    vc = counts.groupby(level=level, dropna=False, sort=False).sum()
+                    vc = vc.sort_values(ascending=False, kind="stable").head(max(limit, 0))
+                    values = pd.Series(vc.index, dtype=vc.index.dtype)
+                    metrics = (vc / total if normalize else vc).tolist()
+                    out["margins"][col] = [{"value": v, "metric": m} for v, m in zip(_column_values(values), metrics)]
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+
+    session.set_last_result(source, result)
+    out.update(
+        {
+            "row_count": int(result.shape[0]),
+            **_rows_payload(result, limit, result_format),
+            **_cursor_fields(session, result, max(limit, 0)),
+        }
+    )
+    if isinstance(source, _CsvStream):
+        out["streamed"] = True
+    return out
+
+
+@mcp.tool()
+@_offloaded
 def filter_rows(
     filters: List[Dict[str, Any]],
     logic: str = "and",
     limit: int = 200,
+    result_format: str = "records",
 ) -> Dict[str, Any]:
     """
     Filter rows using structured filters (safe).
@@ -238,94 +3540,97 @@ def filter_rows(
         "column": "Status",
         "op": "==|!=|>|>=|<|<=|contains|startswith|endswith|in",
         "value": "Open",
-        "case_sensitive": false
+        "case_sensitive": false,
+        "regex": false
       }
+    contains matches value literally; set "regex": true to match it as a
+    regular expression (never served by a trigram index).
+    or a group of filters, nested to any depth:
+      {"and": [filter, ...]}, {"or": [filter, ...]}, {"not": filter}
 
-    logic: "and" or "or"
-
-    Returns:
-      Filtered rows, and row_count.
-    """
-    with _lock:
-        df = _ensure_loaded()
-
-        if logic not in ["and", "or"]:
-            return {"ok": False, "error": "logic must be 'and' or 'or'"}
-
-        mask = None
-        for f in filters:
-            col = f.get("column")
-            op = f.get("op")
-            val = f.get("value")
-            case_sensitive = bool(f.get("case_sensitive", False))
-
-            if not col or col not in df.columns:
-                return {"ok": False, "error": f"Unknown or missing column in filter: {col}"}
-
-            series = df[col]
-
-            if op in ["==", "!=", ">", ">=", "<", "<="]:
-                ops = {
-                    "==": series.eq,
-                    "!=": series.ne,
-                    ">": series.gt,
-                    ">=": series.ge,
-                    "<": series.lt,
-                    "<=": series.le,
-                }
-                try:
-                    m = ops[op](val)
-                except Exception as e:
-                    return {"ok": False, "error": f"Comparison failed for {col} {op} {val}: {e}"}
-
-            elif op in ["contains", "startswith", "endswith"]:
-                s = series.astype("string")
-                needle = str(val)
-                if not case_sensitive:
-                    s = s.str.lower()
-                    needle = needle.lower()
-
-                if op == "contains":
-                    m = s.str.contains(needle, na=False)
-                elif op == "startswith":
-                    m = s.str.startswith(needle, na=False)
-                else:
-                    m = s.str.endswith(needle, na=False)
-
-            elif op == "in":
-                if not isinstance(val, list):
-                    return {"ok": False, "error": "For op='in', value must be a list."}
-                m = series.isin(val)
+    logic: "and" or "or", combining the top-level filters
 
-            else:
-                return {"ok": False, "error": f"Unsupported op: {op}"}
+    Example (one scan, repeated conditions are evaluated once):
+      [{"or": [{"column": "Department", "op": "==", "value": "Sales"},
+               {"and": [{"column": "Department", "op": "==", "value": "HR"},
+                        {"not": {"column": "Status", "op": "==", "value": "Active"}}]}]},
+       {"column": "Tenure", "op": ">=", "value": 5}]
 
-            if mask is None:
-                mask = m
-            else:
-                mask = (mask & m) if logic == "and" else (mask | m)
+    result_format: "records" (list of row objects) or "columnar" (column names
+    once plus one value array per column).
 
-        if mask is None:
-            out = df
-        else:
-            out = df[mask]
+    For a CSV loaded with chunk_rows, the file is scanned chunk by chunk and the
+    full set of matches is spilled to a temporary file for export_last_result.
 
-        STATE.last_result = out.copy()
-        return {"ok": True, "row_count": int(out.shape[0]), "rows": _df_to_rows(out, limit)}
+    Returns:
+      The first `limit` filtered rows, and row_count. When more rows matched,
+      "cursor" and "next_offset" page through the rest with fetch_page.
+      "timings" has filter_seconds; with the pandas backend also index_hits
+      (predicates answered by a create_index index) and, for text filters,
+      text_normalize_seconds (building the cached string/lowercase column on
+      first use) and text_cache_hits.
+    """
+    if logic not in ["and", "or"]:
+        return {"ok": False, "error": "logic must be 'and' or 'or'"}
+    if result_format not in _RESULT_FORMATS:
+        return {"ok": False, "error": f"result_format must be one of {_RESULT_FORMATS}"}
+
+    session = _session()
+    source = _query_source(session)
+    timings: Dict[str, Any] = {}
+    t0 = time.perf_counter()
+    try:
+        row_count, head, last_result = QUERY_BACKEND.filter_rows(source, filters, logic, limit, timings)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    timings["filter_seconds"] = time.perf_counter() - t0
+
+    session.set_last_result(source, last_result)
+    out: Dict[str, Any] = {
+        "ok": True,
+        "row_count": row_count,
+        **_rows_payload(head, limit, result_format),
+        **_cursor_fields(session, last_result, min(int(head.shape[0]), max(limit, 0))),
+        "timings": timings,
+    }
+    if isinstance(source, _CsvStream):
+        out["streamed"] = True
+    return out
 
 
 @mcp.tool()
+@_offloaded
 def groupby_aggregate(
     group_columns: List[str],
     aggregations: List[Dict[str, Any]],
     limit: int = 200,
+    result_format: str = "records",
+    filters: Optional[List[Dict[str, Any]]] = None,
+    logic: str = "and",
 ) -> Dict[str, Any]:
     """
     Group and aggregate.
 
     group_columns: list of columns to group by
     aggregations: list of dicts like:
-      {"column": "Amount", "agg": "sum|mean|min|max|count|nunique"}
+      {"column": "Amount", "agg": "sum|mean|min|max|count|nunique|approx_nunique"}
+    result_format: "records" or "columnar" (see filter_rows)
+    filters, logic: optionally aggregate only the rows matching these filters
+      (same format as filter_rows)
+
+    For a CSV loaded with chunk_rows, partial aggregates are computed per chunk
+    and merged at the end, spilling to disk when there are many groups.
+
+    Groups beyond the first `limit` are paged with fetch_page via "cursor".
+
+    approx_nunique estimates distinct counts with a HyperLogLog sketch in a
+    fraction of nunique's time and memory on high-cardinality columns; its
+    error bound (relative standard error, ~1.6% by default) is returned under
+    "approximate".
+
+    Results are cached per dataset, group columns, set of aggregations and
+    filters (CSV_MCP_RESULT_CACHE_MB, default 64); "cache_hit" is true when
+    the result was served from that cache.
 
     Example:
       groupby_aggregate(
@@ -333,58 +3638,117 @@ def groupby_aggregate(
         [{"column":"WorkerId","agg":"nunique"}]
       )
     """
-    with _lock:
-        df = _ensure_loaded()
+    if result_format not in _RESULT_FORMATS:
+        return {"ok": False, "error": f"result_format must be one of {_RESULT_FORMATS}"}
+    if logic not in ["and", "or"]:
+        return {"ok": False, "error": "logic must be 'and' or 'or'"}
+
+    session = _session()
+    source = _query_source(session)
+    try:
+        agg_map = _agg_map(_source_columns(source), group_columns, aggregations)
+        grouped, cache_hit = GROUPBY_CACHE.get_or_compute(
+            source,
+            group_columns,
+            agg_map,
+            filters,
+            logic,
+            lambda: QUERY_BACKEND.groupby_aggregate(source, group_columns, agg_map, filters, logic),
+        )
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    except TypeError as e:
+        # e.g. mean of a text column
+        return {"ok": False, "error": f"Unsupported agg for these columns: {e}"}
+
+    session.set_last_result(source, grouped)
+    out: Dict[str, Any] = {
+        "ok": True,
+        "row_count": int(grouped.shape[0]),
+        **_rows_payload(grouped, limit, result_format),
+        **_cursor_fields(session, grouped, max(limit, 0)),
+        "cache_hit": cache_hit,
+    }
+    if grouped.attrs.get("approximate"):
+        out["approximate"] = grouped.attrs["approximate"]
+    if isinstance(source, _CsvStream):
+        out["streamed"] = True
+    return out
 
-        missing = [c for c in group_columns if c not in df.columns]
-        if missing:
-            return {"ok": False, "error": f"Unknown group columns: {missing}"}
 
-        agg_map: Dict[str, List[str]] = {}
-        for a in aggregations:
-            col = a.get("column")
-            fn = a.get("agg")
-            if not col or col not in df.columns:
-                return {"ok": False, "error": f"Unknown agg column: {col}"}
-            if fn not in ["sum", "mean", "min", "max", "count", "nunique"]:
-                return {"ok": False, "error": f"Unsupported agg: {fn}"}
-            agg_map.setdefault(col, []).append(fn)
+@mcp.tool()
+@_offloaded
+def fetch_page(cursor: str, offset: int = 0, size: int = 200, result_format: str = "records") -> Dict[str, Any]:
+    """
+    Fetch rows offset .. offset + size of a filter_rows / groupby_aggregate
+    result by its cursor, without re-running the query.
+
+    Cursors belong to the session that created them and expire after
+    CSV_MCP_CURSOR_TTL_SECONDS (default 900) without use.
+
+    Returns:
+      The page of rows, row_count of the whole result, and next_offset
+      (null once the last page has been returned).
+    """
+    if result_format not in _RESULT_FORMATS:
+        return {"ok": False, "error": f"result_format must be one of {_RESULT_FORMATS}"}
+    if offset < 0 or size <= 0:
+        return {"ok": False, "error": "offset must be >= 0 and size must be > 0."}
 
-        grouped = df.groupby(group_columns, dropna=False).agg(agg_map)
-        grouped.columns = ["_".join([c, f]) for c, f in grouped.columns]
-        grouped = grouped.reset_index()
+    session = _session()
+    try:
+        result = session.cursors.get(cursor)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
 
-        STATE.last_result = grouped
-        return {"ok": True, "row_count": int(grouped.shape[0]), "rows": _df_to_rows(grouped, limit)}
+    row_count = _result_row_count(result)
+    page = _result_page(result, offset, size)
+    end = offset + int(page.shape[0])
+    return {
+        "ok": True,
+        "cursor": cursor,
+        "offset": offset,
+        "row_count": row_count,
+        "next_offset": end if end < row_count else None,
+        **_rows_payload(page, size, result_format),
+    }
 
 
 @mcp.tool()
+@_offloaded
 def export_last_result(output_path: str) -> Dict[str, Any]:
     """
     Export the last result (from preview, filter_rows, groupby_aggregate, etc.) to a CSV.
 
     For safety, output must be written under the base directory.
     """
-    with _lock:
-        if STATE.last_result is None:
-            return {"ok": False, "error": "No last_result available. Run a tool that produces a result first."}
-
-        out = Path(output_path).expanduser()
-        if not out.is_absolute():
-            out = (STATE.base_dir / out).resolve()
-        else:
-            out = out.resolve()
+    session = _session()
+    with session.lock.read():
+        last_result = session.last_result
+    if last_result is None:
+        return {"ok": False, "error": "No last_result available. Run a tool that produces a result first."}
 
+    with STATE.base_dir_lock.read():
         base = STATE.base_dir
-        try:
-            out.relative_to(base)
-        except Exception:
-            return {"ok": False, "error": f"Access denied. Output must be under base directory: {base}"}
 
-        out.parent.mkdir(parents=True, exist_ok=True)
-        STATE.last_result.to_csv(out, index=False)
+    out = Path(output_path).expanduser()
+    if not out.is_absolute():
+        out = (base / out).resolve()
+    else:
+        out = out.resolve()
 
-        return {"ok": True, "output_path": str(out), "rows_written": int(STATE.last_result.shape[0])}
+    try:
+        out.relative_to(base)
+    except Exception:
+        return {"ok": False, "error": f"Access denied. Output must be under base directory: {base}"}
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(last_result, (_LazyResult, _SpilledResult)):
+        last_result.to_csv(out)
+        return {"ok": True, "output_path": str(out), "rows_written": last_result.row_count}
+    last_result.to_csv(out, index=False)
+
+    return {"ok": True, "output_path": str(out), "rows_written": int(last_result.shape[0])}
 
 
 @mcp.custom_route("/", methods=["GET"])
@@ -399,7 +3763,19 @@ async def root(_request):
 
 @mcp.custom_route("/health", methods=["GET"])
 async def health(_request):
-    return JSONResponse({"status": "healthy", "service": "csv-analyst"})
+    return JSONResponse(
+        {
+            "status": "healthy",
+            "service": "csv-analyst",
+            **STATE.sessions.stats(),
+            "pool": WORKERS.stats(),
+            "frame_cache": FRAME_CACHE.stats(),
+            "column_cache": COLUMN_CACHE.stats(),
+            "groupby_cache": GROUPBY_CACHE.stats(),
+            "range_pool": RANGES.stats(),
+            "query_backend": QUERY_BACKEND.name,
+        }
+    )
 
 
 app = mcp.http_app()
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+Load-time column statistics vs recomputing them per call.
+
+Builds the _ColumnStatistics of a synthetic frame once (the extra load time)
+and compares what it replaces: the per-column null counts of get_schema and
+df.describe() for describe_numeric, plus filters planned with and without the
+statistics (a range predicate min/max rule out, and a selective one ranked
+from the histogram). Checks that the results are unchanged and prints the
+median time of each.
+
+Usage:
+  python scripts/bench_column_stats.py --rows 5000000 [--categorize]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as server  # noqa: E402
+from bench_query_backends import make_frame  # noqa: E402
+
+FILTERS = [
+    [{"column": "Salary", "op": ">", "value": 1_000_000}, {"column": "JobTitle", "op": "contains", "value": "Level 1"}],
+    [{"column": "JobTitle", "op": "contains", "value": "Level 1"}, {"column": "Tenure", "op": ">=", "value": 38}],
+]
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--categorize", action="store_true", help="dictionary-encode text columns like load_csv")
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    if args.categorize:
+        server._dictionary_encode(df, server._CATEGORY_MAX_RATIO)
+
+    stats, t_build = timed(lambda: server._ColumnStatistics(df, server.RANGES), 1)
+    nulls, t_nulls = timed(lambda: {c: int(df[c].isna().sum()) for c in df.columns}, args.repeat)
+    desc, t_desc = timed(lambda: df.describe(include="number").transpose(), args.repeat)
+    if nulls != stats.nulls or not np.allclose(desc.to_numpy(), stats.describe.to_numpy(), equal_nan=True):
+        raise SystemExit("MISMATCH between the statistics and get_schema/describe_numeric")
+
+    print(f"rows={args.rows:,}")
+    print(f"{'build statistics (once, at load)':<58} {t_build:9.4f}")
+    print(f"{'get_schema null counts, per call':<58} {t_nulls:9.4f}")
+    print(f"{'describe_numeric, per call':<58} {t_desc:9.4f}")
+    for filters in FILTERS:
+        plain = server._FilterPlan(df, filters, "and")
+        planned = server._FilterPlan(df, filters, "and", stats=stats)
+        before, t_before = timed(lambda: plain.mask(df), args.repeat)
+        after, t_after = timed(lambda: planned.mask(df), args.repeat)
+        if not (before == after).all():
+            raise SystemExit(f"MISMATCH for {filters}")
+        print(f"{planned.explain():<58} {t_before:9.4f} -> {t_after:.4f}")
+
+    print("all results match")
+
+
+if __name__ == "__main__":
+    main()
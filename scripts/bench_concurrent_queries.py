@@ -0,0 +1,91 @@
+"""
+Concurrent query throughput: serialized tool calls vs the reader/writer lock.
+
+Loads a synthetic CSV into the default session, then hammers the read-only
+tools from N threads, first with each whole tool call holding one global
+lock (the old server, which ran every query inside an exclusive session
+lock) and then as the server runs them, sharing the session's reader/writer
+lock.
+
+Usage:
+  python scripts/bench_concurrent_queries.py --rows 1000000 --threads 8 --seconds 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_csv(path: Path, rows: int) -> None:
+    # Imported here: bench_query_backends imports main, which must see
+    # CSV_MCP_BASEDIR first.
+    from bench_query_backends import make_frame
+
+    make_frame(rows).to_csv(path, index=False)
+
+
+def sync(tool):
+    """The synchronous body behind an @_offloaded tool."""
+    return tool.fn.__wrapped__
+
+
+def run(server, threads: int, seconds: float, serialized: bool) -> float:
+    queries = [
+        lambda: sync(server.value_counts)("Location"),
+        lambda: sync(server.groupby_aggregate)(["Department"], [{"column": "Salary", "agg": "mean"}], limit=10),
+        lambda: sync(server.filter_rows)([{"column": "Tenure", "op": ">=", "value": 25}], limit=10),
+        lambda: sync(server.describe_numeric)(),
+    ]
+    # Query execution no longer happens under the session lock, so swapping that
+    # lock would not model the old server: serialize the whole call instead.
+    lock = threading.Lock() if serialized else nullcontext()
+    done = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def worker(i: int) -> None:
+        n = 0
+        while time.perf_counter() < stop:
+            with lock:
+                queries[(i + n) % len(queries)]()
+            n += 1
+        done[i] = n
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return sum(done) / seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CSV_MCP_BASEDIR"] = tmp
+        import main as server
+
+        csv_path = Path(tmp) / "bench.csv"
+        make_csv(csv_path, args.rows)
+        sync(server.load_csv)(str(csv_path), sample_rows=0)
+
+        before = run(server, args.threads, args.seconds, serialized=True)
+        after = run(server, args.threads, args.seconds, serialized=False)
+
+    print(f"rows={args.rows:,} threads={args.threads}")
+    print(f"serialized calls : {before:8.1f} queries/s")
+    print(f"reader/writer    : {after:8.1f} queries/s  ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
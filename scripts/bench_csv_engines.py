@@ -0,0 +1,108 @@
+"""
+Parse time and memory of load_csv's engine / dtype_backend combinations.
+
+Generates synthetic HR-style CSVs (bench_query_backends.make_frame: a few
+numeric columns plus repetitive text columns) for each requested row count
+and parses each one with every configuration in a fresh process, so peak RSS
+is not polluted by earlier runs.
+
+Reported per run:
+  seconds   wall-clock time of pd.read_csv
+  frame_mb  DataFrame.memory_usage(deep=True)
+  peak_mb   peak resident set size of the worker process (POSIX only)
+
+Usage:
+  python scripts/bench_csv_engines.py --rows 10000 100000 1000000 10000000
+"""
+import argparse
+import multiprocessing as mp
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+CONFIGS = [
+    ("c", None),
+    ("c", "pyarrow"),
+    ("pyarrow", None),
+    ("pyarrow", "pyarrow"),
+]
+
+
+def make_csv(path: Path, rows: int) -> None:
+    # Imported here so the parse workers do not load main and skew peak_mb.
+    from bench_query_backends import make_frame
+
+    chunk = 1_000_000
+    frame = make_frame(min(rows, chunk))
+    for start in range(0, rows, chunk):
+        # Written a chunk at a time to keep memory flat for large row counts.
+        part = frame.head(min(chunk, rows - start)).assign(WorkerId=lambda df: df["WorkerId"] + start)
+        part.to_csv(path, mode="a" if start else "w", header=start == 0, index=False)
+
+
+def _measure(path: str, engine: str, dtype_backend, out) -> None:
+    kwargs = {"engine": engine}
+    if dtype_backend:
+        kwargs["dtype_backend"] = dtype_backend
+    t0 = time.perf_counter()
+    df = pd.read_csv(path, **kwargs)
+    seconds = time.perf_counter() - t0
+    frame_bytes = int(df.memory_usage(deep=True).sum())
+    out.put((seconds, frame_bytes, _peak_rss()))
+
+
+def _peak_rss():
+    # Linux: VmHWM, which exec resets; ru_maxrss there keeps the peak of the
+    # parent that spawned the worker.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+def measure(path: Path, engine: str, dtype_backend) -> tuple:
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(str(path), engine, dtype_backend, out))
+    proc.start()
+    result = out.get()
+    proc.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    mb = 1024 * 1024
+    print(f"{'rows':>10} {'engine':>8} {'dtype_backend':>14} {'seconds':>8} {'frame_mb':>9} {'peak_mb':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = Path(tmp) / f"bench_{rows}.csv"
+            make_csv(path, rows)
+            for engine, dtype_backend in CONFIGS:
+                seconds, frame_bytes, peak_bytes = measure(path, engine, dtype_backend)
+                peak = f"{peak_bytes / mb:8.1f}" if peak_bytes else f"{'n/a':>8}"
+                print(
+                    f"{rows:>10,} {engine:>8} {str(dtype_backend):>14} "
+                    f"{seconds:8.3f} {frame_bytes / mb:9.1f} {peak}"
+                )
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
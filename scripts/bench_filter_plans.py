@@ -0,0 +1,124 @@
+"""
+filter_rows masks: compiled filter plans vs evaluating filters in given order.
+
+For each filter list, builds the mask the old way (every predicate over the
+full column, combined with &/| in the order given) and through the cached
+_FilterPlan, checks that both select the same rows, and prints the median
+time of each.
+
+Usage:
+  python scripts/bench_filter_plans.py --rows 2000000 --repeat 5 [--categorize]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as server  # noqa: E402
+from bench_query_backends import FILTERS, make_frame  # noqa: E402
+
+PLANNED = FILTERS + [
+    (
+        [
+            {
+                "or": [
+                    {"column": "Department", "op": "==", "value": "HR"},
+                    {"column": "JobTitle", "op": "contains", "value": "level 7"},
+                ]
+            },
+            {
+                "or": [
+                    {"column": "Department", "op": "==", "value": "HR"},
+                    {"column": "Status", "op": "==", "value": "Leave"},
+                ]
+            },
+            {"not": {"column": "JobTitle", "op": "contains", "value": "level 7"}},
+        ],
+        "and",
+    ),
+    (
+        [
+            {"column": "JobTitle", "op": "contains", "value": "level 1"},
+            {"column": "Salary", "op": ">", "value": 110000},
+            {"column": "Department", "op": "==", "value": "HR"},
+        ],
+        "and",
+    ),
+    (
+        [
+            {"column": "JobTitle", "op": "contains", "value": "level 1"},
+            {"column": "Tenure", "op": ">=", "value": 0},
+        ],
+        "or",
+    ),
+    (
+        [
+            {"column": "Status", "op": "!=", "value": "Active"},
+            {"column": "Salary", "op": "<", "value": 50000},
+            {"column": "Tenure", "op": "in", "value": [1, 2]},
+        ],
+        "and",
+    ),
+]
+
+
+def unplanned_mask(df: pd.DataFrame, filters, logic: str):
+    mask = None
+    for f in filters:
+        if "not" in f:
+            m = ~unplanned_mask(df, [f["not"]], "and")
+        elif "and" in f or "or" in f:
+            group = "and" if "and" in f else "or"
+            m = unplanned_mask(df, f[group], group)
+        else:
+            series = df[f["column"]]
+            args = (f["column"], f["op"], f.get("value"), bool(f.get("case_sensitive", False)))
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                m = server._categorical_predicate(series, *args)
+            else:
+                m = server._predicate(series, *args)
+            m = m.to_numpy(dtype=bool, na_value=False)
+        mask = m if mask is None else ((mask & m) if logic == "and" else (mask | m))
+    return mask
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--categorize", action="store_true", help="dictionary-encode text columns like load_csv")
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    if args.categorize:
+        server._dictionary_encode(df, server._CATEGORY_MAX_RATIO)
+
+    print(f"rows={args.rows:,}")
+    print(f"{'filter':<12} {'matches':>10} {'in order':>9} {'planned':>9}  plan")
+    for i, (filters, logic) in enumerate(PLANNED):
+        before, t_before = timed(lambda: unplanned_mask(df, filters, logic), args.repeat)
+        after, t_after = timed(lambda: server._filter_mask(df, filters, logic), args.repeat)
+        if not (before == after).all():
+            raise SystemExit(f"MISMATCH in filter #{i}")
+        plan = server.FILTER_PLANS.get(df, filters, logic)
+        print(f"{f'#{i}':<12} {int(after.sum()):>10,} {t_before:9.4f} {t_after:9.4f}  {plan.explain()}")
+
+    print("all masks match")
+
+
+if __name__ == "__main__":
+    main()
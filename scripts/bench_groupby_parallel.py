@@ -0,0 +1,76 @@
+"""
+Scaling of partitioned groupby_aggregate across 1..N range threads.
+
+For each thread count, factorizes the group keys and runs the aggregations
+from scratch (no cached partition or value codes) with a _RangeExecutor of
+that many threads, checks that the result equals the single-threaded one,
+and prints the median time and the speedup over one thread.
+
+Usage:
+  python scripts/bench_groupby_parallel.py --rows 20000000 --threads 1 2 4 8 [--categorize]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as server  # noqa: E402
+from bench_query_backends import assert_same, make_frame  # noqa: E402
+
+QUERIES = [
+    (["Department"], {"Salary": ["sum", "mean", "min", "max", "count"]}),
+    (["Department", "Status"], {"Tenure": ["mean", "max"], "JobTitle": ["nunique"]}),
+    (["Location", "Tenure"], {"Salary": ["mean"], "WorkerId": ["nunique"]}),
+]
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, statistics.median(times)
+
+
+def run(df, group_columns, agg_map, pool):
+    return server._GroupPartition(df, group_columns, pool).aggregate(df, agg_map, None, None, pool)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=4_000_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--range-rows", type=int, default=500_000, help="minimum rows per range")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--categorize", action="store_true", help="dictionary-encode text columns like load_csv")
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    if args.categorize:
+        server._dictionary_encode(df, server._CATEGORY_MAX_RATIO)
+
+    threads = sorted(set(args.threads))
+    print(f"rows={args.rows:,} cpus={os.cpu_count()}")
+    print(f"{'query':<36} " + " ".join(f"{f'{n} thr':>13}" for n in threads))
+    for group_columns, agg_map in QUERIES:
+        baseline, cells = None, []
+        for n in threads:
+            pool = server._RangeExecutor(threads=n, min_rows=args.range_rows)
+            grouped, t = timed(lambda: run(df, group_columns, agg_map, pool), args.repeat)
+            if baseline is None:
+                baseline = (grouped, t)
+            else:
+                assert_same(baseline[0], grouped, f"groupby {group_columns} with {n} threads")
+            cells.append(f"{t:7.3f} {baseline[1] / t:4.1f}x")
+        print(f"{str(group_columns):<36} " + " ".join(f"{c:>13}" for c in cells))
+
+    print("all results match")
+
+
+if __name__ == "__main__":
+    main()
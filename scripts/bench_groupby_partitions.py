@@ -0,0 +1,79 @@
+"""
+groupby_aggregate on a cached group partition vs a fresh pandas groupby.
+
+For each grouping, factorizes the group keys once (the cached _GroupPartition),
+then runs several aggregation lists both ways: df.groupby(...).agg(...) from
+scratch, and the partition's bincount / ufunc.at kernels with the server's
+column cache (value codes for nunique are factorized on first use). Checks that
+both return the same frame and prints the median time of each.
+
+Usage:
+  python scripts/bench_groupby_partitions.py --rows 5000000 --repeat 5 [--categorize]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as server  # noqa: E402
+from bench_query_backends import assert_same, make_frame  # noqa: E402
+
+GROUPINGS = [["Department"], ["Department", "Status"], ["Location", "Tenure"]]
+
+AGGREGATIONS = [
+    {"Salary": ["sum"]},
+    {"Salary": ["mean", "min", "max"]},
+    {"Tenure": ["sum", "count"], "Salary": ["count"]},
+    {"WorkerId": ["nunique"]},
+    {"JobTitle": ["nunique", "count"]},
+]
+
+
+def pandas_groupby(df: pd.DataFrame, group_columns, agg_map) -> pd.DataFrame:
+    grouped = df.groupby(group_columns, dropna=False, observed=True).agg(agg_map)
+    grouped.columns = ["_".join([c, f]) for c, f in grouped.columns]
+    return grouped.reset_index()
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--categorize", action="store_true", help="dictionary-encode text columns like load_csv")
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    if args.categorize:
+        server._dictionary_encode(df, server._CATEGORY_MAX_RATIO)
+
+    print(f"rows={args.rows:,}")
+    print(f"{'grouping':<26} {'aggregations':<44} {'pandas':>9} {'cached':>9}")
+    for group_columns in GROUPINGS:
+        partition, build = timed(lambda: server.COLUMN_CACHE.partition(df, group_columns), 1)
+        for agg_map in AGGREGATIONS:
+            before, t_before = timed(lambda: pandas_groupby(df, group_columns, agg_map), args.repeat)
+            after, t_after = timed(lambda: partition.aggregate(df, agg_map, None, server.COLUMN_CACHE), args.repeat)
+            assert_same(before, after, f"groupby {group_columns} {agg_map}")
+            label = ", ".join(f"{c}:{'/'.join(fns)}" for c, fns in agg_map.items())
+            print(f"{str(group_columns):<26} {label:<44} {t_before:9.4f} {t_after:9.4f}")
+        print(f"{str(group_columns):<26} partition build {build:.3f}s, {len(partition.counts):,} groups")
+
+    print("all results match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Result parity and speed of the pandas and duckdb query backends.
+
+Runs the same filter_rows / value_counts / groupby_aggregate specs through both
+backends on a synthetic DataFrame, fails loudly if any result differs, and
+prints the median time of each query per backend.
+
+Usage:
+  python scripts/bench_query_backends.py --rows 2000000 --repeat 5 [--categorize]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as server  # noqa: E402
+
+FILTERS = [
+    ([{"column": "Department", "op": "==", "value": "Sales"}], "and"),
+    ([{"column": "Status", "op": "!=", "value": "Active"}], "and"),
+    ([{"column": "Salary", "op": ">=", "value": 95000}, {"column": "Tenure", "op": "<", "value": 3}], "and"),
+    (
+        [
+            {"column": "Location", "op": "in", "value": ["Site 1", "Site 7"]},
+            {"column": "Tenure", "op": ">", "value": 35},
+        ],
+        "or",
+    ),
+    # SQL IN never matches NULL; listing None must still match missing values.
+    ([{"column": "Status", "op": "in", "value": ["Leave", None]}], "and"),
+    ([{"column": "JobTitle", "op": "contains", "value": "level 12"}], "and"),
+    ([{"column": "JobTitle", "op": "startswith", "value": "senior"}], "and"),
+    ([{"column": "JobTitle", "op": "endswith", "value": "99", "case_sensitive": True}], "and"),
+    (
+        [
+            {
+                "or": [
+                    {"column": "Department", "op": "==", "value": "Sales"},
+                    {
+                        "and": [
+                            {"column": "Department", "op": "==", "value": "HR"},
+                            {"not": {"column": "Status", "op": "==", "value": "Active"}},
+                        ]
+                    },
+                ]
+            },
+            {
+                "not": {
+                    "or": [
+                        {"column": "Tenure", "op": "<", "value": 5},
+                        {"column": "Salary", "op": "<", "value": 60000},
+                    ]
+                }
+            },
+        ],
+        "and",
+    ),
+]
+
+VALUE_COUNTS = [
+    ("Department", False, True),
+    ("Status", True, False),
+    ("Location", False, False),
+]
+
+GROUPBYS = [
+    (["Department"], {"Salary": ["sum", "mean", "min", "max", "count"], "WorkerId": ["nunique"]}),
+    (["Department", "Status"], {"Tenure": ["mean", "max"], "JobTitle": ["nunique"]}),
+    (["Location"], {"Salary": ["mean"]}),
+]
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "WorkerId": np.arange(rows),
+            "Department": rng.choice(["HR", "Engineering", "Sales", "Operations", "Finance"], rows),
+            "Location": rng.choice([f"Site {i}" for i in range(40)], rows),
+            "JobTitle": rng.choice([f"Senior Specialist Level {i}" for i in range(2000)], rows),
+            "Status": rng.choice(["Active", "Terminated", "Leave"], rows),
+            "Salary": rng.normal(80000, 15000, rows).round(2),
+            "Tenure": rng.integers(0, 40, rows),
+        }
+    )
+    # Sprinkle missing values so null handling is part of the comparison.
+    df.loc[rng.random(rows) < 0.02, "Status"] = None
+    df.loc[rng.random(rows) < 0.02, "Salary"] = np.nan
+    return df
+
+
+def as_values(df: pd.DataFrame) -> pd.DataFrame:
+    """Compare values, not storage: categorical/Arrow/object text all become object."""
+    df = df.reset_index(drop=True).copy()
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(df[c].dtype):
+            df[c] = df[c].astype(object).where(df[c].notna(), None)
+    return df
+
+
+def assert_same(a: pd.DataFrame, b: pd.DataFrame, what: str) -> None:
+    a = as_values(a)
+    b = as_values(b)
+    try:
+        pd.testing.assert_frame_equal(a, b, check_dtype=False, check_exact=False, rtol=1e-9)
+    except AssertionError as e:
+        raise SystemExit(f"MISMATCH in {what}:\n{e}")
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--categorize", action="store_true", help="dictionary-encode text columns like load_csv")
+    args = parser.parse_args()
+
+    if server.duckdb is None:
+        raise SystemExit("duckdb is not installed.")
+    backends = [server._PandasBackend(), server._DuckDBBackend()]
+    df = make_frame(args.rows)
+    if args.categorize:
+        server._dictionary_encode(df, server._CATEGORY_MAX_RATIO)
+
+    print(f"rows={args.rows:,}")
+    print(f"{'query':<48} {'pandas':>9} {'duckdb':>9}")
+
+    for i, (filters, logic) in enumerate(FILTERS):
+        results, times = [], []
+        for backend in backends:
+            (count, _, full), t = timed(lambda: backend.filter_rows(df, filters, logic, 200), args.repeat)
+            results.append(server._result_page(full, 0, count))
+            times.append(t)
+        assert_same(results[0], results[1], f"filter #{i}")
+        print(f"{f'filter #{i} ({len(results[0]):,} rows)':<48} {times[0]:9.4f} {times[1]:9.4f}")
+
+    for column, normalize, dropna in VALUE_COUNTS:
+        results, times = [], []
+        for backend in backends:
+            vc, t = timed(lambda: backend.value_counts(df, column, normalize, dropna, 10_000), args.repeat)
+            counts = as_values(vc.rename_axis("value").reset_index(name="metric"))
+            results.append(counts.sort_values("value", key=lambda v: v.astype(str), na_position="last"))
+            times.append(t)
+        assert_same(results[0], results[1], f"value_counts {column}")
+        print(f"{f'value_counts {column}':<48} {times[0]:9.4f} {times[1]:9.4f}")
+
+    for group_columns, agg_map in GROUPBYS:
+        results, times = [], []
+        for backend in backends:
+            grouped, t = timed(lambda: backend.groupby_aggregate(df, group_columns, agg_map), args.repeat)
+            results.append(grouped)
+            times.append(t)
+        assert_same(results[0], results[1], f"groupby {group_columns}")
+        print(f"{f'groupby {group_columns}':<48} {times[0]:9.4f} {times[1]:9.4f}")
+
+    print("all results match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Cost of turning result rows into the JSON text a tool call returns.
+
+Compares, for 200 / 10k / 100k-row results:
+  legacy    DataFrame.to_dict(orient="records") + FastMCP's default serializer
+  records   _df_to_rows + _serialize_tool_result (orjson when installed)
+  columnar  _df_to_table + _serialize_tool_result
+
+FastMCP also builds the structured copy of every result with
+pydantic_core.to_jsonable_python; that step is timed separately.
+
+Usage:
+  python scripts/bench_serialization.py --rows 200 10000 100000
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import pydantic_core
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as server  # noqa: E402
+from bench_query_backends import make_frame  # noqa: E402
+
+
+def make_result(rows: int) -> pd.DataFrame:
+    df = make_frame(rows)
+    # A timestamp column, so converting datetimes is part of the comparison.
+    df["HireDate"] = pd.Timestamp("2000-01-01") + pd.to_timedelta(df["WorkerId"] * 7919 % 9000, unit="D")
+    server._dictionary_encode(df, server._CATEGORY_MAX_RATIO)
+    return df
+
+
+def check_missing_timestamps() -> None:
+    """Blank Arrow-backed timestamps (pd.NA, not NaT) must serialize as None."""
+    if server.pa is None:
+        return
+    df = pd.DataFrame(
+        {"HireDate": pd.Series([pd.Timestamp("2000-01-01 08:30"), None], dtype="timestamp[ns][pyarrow]")}
+    )
+    expected = ["2000-01-01T08:30:00", None]
+    if [row["HireDate"] for row in server._df_to_rows(df, 2)] != expected:
+        raise SystemExit("MISMATCH in records of a missing Arrow timestamp")
+    if server._df_to_table(df, 2)["data"] != [expected]:
+        raise SystemExit("MISMATCH in columnar data of a missing Arrow timestamp")
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[200, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    check_missing_timestamps()
+    paths = {
+        "legacy": lambda df: pydantic_core.to_json(df.to_dict(orient="records"), fallback=str).decode(),
+        "records": lambda df: server._serialize_tool_result(server._df_to_rows(df, len(df))),
+        "columnar": lambda df: server._serialize_tool_result(server._df_to_table(df, len(df))),
+    }
+    print(f"orjson: {'yes' if server.orjson is not None else 'no (pydantic fallback)'}")
+    print(f"{'rows':>8} {'path':>9} {'serialize_s':>12} {'structured_s':>13} {'bytes':>11}")
+    for rows in args.rows:
+        df = make_result(rows)
+        for name, fn in paths.items():
+            text, t = timed(lambda: fn(df), args.repeat)
+            payload = df.to_dict(orient="records") if name == "legacy" else (
+                server._df_to_rows(df, rows) if name == "records" else server._df_to_table(df, rows)
+            )
+            _, t_struct = timed(lambda: pydantic_core.to_jsonable_python(payload, fallback=str), args.repeat)
+            print(f"{rows:>8,} {name:>9} {t:12.4f} {t_struct:13.4f} {len(text):>11,}")
+
+
+if __name__ == "__main__":
+    main()
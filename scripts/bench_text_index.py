@@ -0,0 +1,78 @@
+"""
+Text filters with and without a create_index trigram index.
+
+Builds a synthetic job-title column with the requested number of distinct
+values, runs each contains/startswith/endswith query once as a scan (over the
+cached normalized column) and once through the trigram index, checks that both
+match the same rows, and prints the median time of each.
+
+Usage:
+  python scripts/bench_text_index.py --rows 3000000 --distinct 2000 1000000
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as server  # noqa: E402
+
+WORDS = ["Senior", "Junior", "Data", "Engineer", "Analyst", "HR", "Partner", "Lead", "Payroll", "Manager"]
+
+QUERIES = [
+    ("contains", "engineer 12", False),
+    ("contains", "Engineer 12", True),
+    ("contains", "hr p", False),
+    ("startswith", "senior data", False),
+    ("endswith", "99", True),
+    ("contains", "zzz", False),
+]
+
+
+def make_frame(rows: int, distinct: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    titles = np.array([" ".join(rng.choice(WORDS, 4)) + f" {i}" for i in range(distinct)], dtype=object)
+    return pd.DataFrame({"JobTitle": titles[rng.integers(0, distinct, rows)]})
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, nargs="+", default=[2_000, 500_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'distinct':>10} {'query':<32} {'matches':>9} {'scan':>8} {'index':>8}")
+    for distinct in args.distinct:
+        df = make_frame(args.rows, distinct)
+        index, build = timed(lambda: server._TrigramIndex(df["JobTitle"]), 1)
+        for op, value, case_sensitive in QUERIES:
+            filters = [{"column": "JobTitle", "op": op, "value": value, "case_sensitive": case_sensitive}]
+            plan = server._FilterPlan(df, filters, "and")
+            scan, t_scan = timed(lambda: plan.mask(df, server.COLUMN_CACHE), args.repeat)
+            hits, t_index = timed(lambda: index.match(op, value, case_sensitive), args.repeat)
+            if not (scan == hits).all():
+                raise SystemExit(f"MISMATCH for {op} {value!r}")
+            label = f"{op} {value!r}" + (" (case)" if case_sensitive else "")
+            print(f"{distinct:>10,} {label:<32} {int(hits.sum()):>9,} {t_scan:8.4f} {t_index:8.4f}")
+        print(f"{distinct:>10,} index build {build:.2f}s, {index.nbytes / 1024 / 1024:.1f} MB")
+
+    print("all results match")
+
+
+if __name__ == "__main__":
+    main()
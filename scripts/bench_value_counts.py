@@ -0,0 +1,78 @@
+"""
+Top-k value_counts: full value_counts vs cached codes vs heavy hitters.
+
+Builds a Zipf-distributed, high-cardinality text column and runs top-`limit`
+value_counts three ways: pandas value_counts().head(limit) (the previous
+implementation), the pandas backend's exact path over cached factorized codes
+(first call factorizes, later calls reuse the codes), and the approximate
+Misra-Gries path. Checks that the exact results match and that every
+approximate count is within its reported error bound, and prints the median
+time of each.
+
+Usage:
+  python scripts/bench_value_counts.py --rows 10000000 --distinct 2000000 --limit 25
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as server  # noqa: E402
+
+
+def make_frame(rows: int, distinct: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    titles = np.array([f"Job title {i}" for i in range(distinct)], dtype=object)
+    return pd.DataFrame({"JobTitle": titles[(rng.zipf(1.2, rows) - 1) % distinct]})
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--distinct", type=int, default=500_000)
+    parser.add_argument("--limit", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.distinct)
+    backend = server._PandasBackend()
+
+    full, t_full = timed(lambda: df["JobTitle"].value_counts().head(args.limit), args.repeat)
+    first, t_first = timed(lambda: backend.value_counts(df, "JobTitle", False, True, args.limit), 1)
+    cached, t_cached = timed(lambda: backend.value_counts(df, "JobTitle", False, True, args.limit), args.repeat)
+    approx, t_approx = timed(lambda: backend.value_counts(df, "JobTitle", False, True, args.limit, True), args.repeat)
+
+    for name, result in [("first call", first), ("cached", cached)]:
+        if result.index.tolist() != full.index.tolist() or result.tolist() != full.tolist():
+            raise SystemExit(f"MISMATCH in exact top-{args.limit} ({name})")
+    bound = approx.attrs["approximate"]
+    true = df["JobTitle"].value_counts()
+    for value, count in approx.items():
+        if not true[value] - bound["max_count_error"] <= count <= true[value]:
+            raise SystemExit(f"Count of {value!r} outside its error bound")
+
+    print(f"rows={args.rows:,} distinct={df['JobTitle'].nunique():,} limit={args.limit}")
+    print(f"{'pandas value_counts':<34} {t_full:8.4f}")
+    print(f"{'codes, first call (factorize)':<34} {t_first:8.4f}")
+    print(f"{'codes, cached':<34} {t_cached:8.4f}")
+    print(f"{'heavy hitters (approximate)':<34} {t_approx:8.4f}  max_count_error={bound['max_count_error']:,}")
+    print("exact results match; approximate counts within bound")
+
+
+if __name__ == "__main__":
+    main()
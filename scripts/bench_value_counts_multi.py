@@ -0,0 +1,73 @@
+"""
+Joint value counts of several columns: pandas vs the cached group partition.
+
+For each column combination, counts the joint frequencies with pandas
+df.value_counts(columns) and with the pandas backend's joint_counts (the first
+call builds the group partition groupby_aggregate also uses, later calls reuse
+it), then lays them out as a crosstab. Checks that the counts and the crosstab
+match pandas and prints the median time of each.
+
+Usage:
+  python scripts/bench_value_counts_multi.py --rows 5000000 [--categorize]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as server  # noqa: E402
+from bench_query_backends import make_frame  # noqa: E402
+
+COMBINATIONS = [["Department", "Status"], ["Location", "Department", "Status"], ["JobTitle", "Department"]]
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--categorize", action="store_true", help="dictionary-encode text columns like load_csv")
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    if args.categorize:
+        server._dictionary_encode(df, server._CATEGORY_MAX_RATIO)
+    backend = server._PandasBackend()
+
+    print(f"rows={args.rows:,}")
+    print(f"{'columns':<40} {'pandas':>9} {'first':>9} {'cached':>9} {'crosstab':>9} {'pd.crosstab':>12}")
+    for columns in COMBINATIONS:
+        expected, t_pandas = timed(lambda: df.value_counts(columns), args.repeat)
+        _, t_first = timed(lambda: backend.joint_counts(df, columns, True), 1)
+        counts, t_cached = timed(lambda: backend.joint_counts(df, columns, True), args.repeat)
+        if not counts.sort_index().equals(expected.sort_index().astype(np.int64)):
+            raise SystemExit(f"MISMATCH in joint counts of {columns}")
+
+        table, t_table = timed(lambda: server._crosstab(counts, False, True), args.repeat)
+        reference, t_reference = timed(
+            lambda: pd.crosstab([df[c] for c in columns[:-1]], df[columns[-1]], margins=True), args.repeat
+        )
+        if not np.array_equal(table.iloc[:, len(columns) - 1 :].to_numpy(), reference.to_numpy()):
+            raise SystemExit(f"MISMATCH in crosstab of {columns}")
+        label = ", ".join(columns)
+        print(f"{label:<40} {t_pandas:9.4f} {t_first:9.4f} {t_cached:9.4f} {t_table:9.4f} {t_reference:12.4f}")
+
+    print("all results match")
+
+
+if __name__ == "__main__":
+    main()